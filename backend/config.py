@@ -1,71 +1,211 @@
 """
 Configuration module for loading environment variables
 """
+import base64
+import binascii
+import logging
 import os
+from dataclasses import dataclass
+from typing import Callable, Optional
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Mock mode for testing without real API calls
-MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
+# Load environment variables from .env file (development only).
+# In production the environment is injected directly: set APP_ENV=production
+# to skip reading .env. Variables already in the environment always win.
+_dotenv_path = os.getenv("DOTENV_PATH", os.path.join(os.path.dirname(__file__), ".env"))
+if os.getenv("APP_ENV", "dev") != "production" and os.path.exists(_dotenv_path):
+    load_dotenv(_dotenv_path, override=False)
 
-# Freepik API
-FREEPIK_API_KEY = os.getenv("FREEPIK_API_KEY", "")
-FREEPIK_API_BASE_URL = os.getenv("FREEPIK_API_BASE_URL", "https://api.freepik.com/v1/ai/video")
-FREEPIK_RUNWAY_BASE_URL = os.getenv("FREEPIK_RUNWAY_BASE_URL", FREEPIK_API_BASE_URL)
 
-# Explicit endpoints (set these for real API)
-FREEPIK_RUNWAY_CREATE_URL = os.getenv(
-    "FREEPIK_RUNWAY_CREATE_URL",
-    f"{FREEPIK_RUNWAY_BASE_URL}/runway-act-two"
-)
-FREEPIK_RUNWAY_STATUS_URL_TEMPLATE = os.getenv(
-    "FREEPIK_RUNWAY_STATUS_URL_TEMPLATE",
-    f"{FREEPIK_RUNWAY_BASE_URL}/runway-act-two/{{task_id}}"
-)
+def webhook_signing_key(secret: str) -> bytes:
+    """
+    Decode a webhook secret into its HMAC key
 
-# Seedream 4 Edit (image editing)
-FREEPIK_SEEDREAM_EDIT_CREATE_URL = os.getenv(
-    "FREEPIK_SEEDREAM_EDIT_CREATE_URL",
-    "https://api.freepik.com/v1/ai/text-to-image/seedream-v4-edit"
-)
-FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE = os.getenv(
-    "FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE",
-    "https://api.freepik.com/v1/ai/text-to-image/seedream-v4-edit/{task_id}"
-)
+    "whsec_"-prefixed secrets (Standard Webhooks) carry a base64 key; other
+    values are used as-is.
 
-# Kling 2.5 Pro (image-to-video)
-FREEPIK_KLING_CREATE_URL = os.getenv(
-    "FREEPIK_KLING_CREATE_URL",
-    "https://api.freepik.com/v1/ai/image-to-video/kling-v2-5-pro"
-)
-FREEPIK_KLING_STATUS_URL_TEMPLATE = os.getenv(
-    "FREEPIK_KLING_STATUS_URL_TEMPLATE",
-    "https://api.freepik.com/v1/ai/image-to-video/kling-v2-5-pro/{task_id}"
+    Raises:
+        ValueError: If a "whsec_" secret is not valid base64
+    """
+    if not secret.startswith("whsec_"):
+        return secret.encode()
+    try:
+        return base64.b64decode(secret[6:], validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"FREEPIK_WEBHOOK_SECRET is not a valid whsec_ secret: {e}") from None
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Application settings, read from the environment once at import"""
+
+    # Mock mode for testing without real API calls
+    MOCK_MODE: bool
+
+    # Freepik API
+    FREEPIK_API_KEY: str
+    FREEPIK_API_BASE_URL: str
+    FREEPIK_RUNWAY_BASE_URL: str
+
+    # Explicit endpoints (set these for real API)
+    FREEPIK_RUNWAY_CREATE_URL: str
+    FREEPIK_RUNWAY_STATUS_URL_TEMPLATE: str
+
+    # Seedream 4 Edit (image editing)
+    FREEPIK_SEEDREAM_EDIT_CREATE_URL: str
+    FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE: str
+
+    # Kling 2.5 Pro (image-to-video)
+    FREEPIK_KLING_CREATE_URL: str
+    FREEPIK_KLING_STATUS_URL_TEMPLATE: str
+
+    # Most concurrent requests to Freepik per worker
+    FREEPIK_MAX_CONCURRENCY: int
+
+    # Freepik webhooks (optional) - public URL of /api/webhook/freepik and the
+    # signing secret; when set, task status comes from webhooks, not polling
+    FREEPIK_WEBHOOK_URL: str
+    FREEPIK_WEBHOOK_SECRET: str
+    # HMAC key decoded from FREEPIK_WEBHOOK_SECRET
+    FREEPIK_WEBHOOK_KEY: bytes
+
+    # Cloudinary
+    CLOUDINARY_CLOUD_NAME: str
+    CLOUDINARY_API_KEY: str
+    CLOUDINARY_API_SECRET: str
+
+    # Redis (optional) - shared upload/task storage for multi-worker deployments
+    # Leave empty to keep records in process memory
+    REDIS_URL: str
+
+    # CORS - origins allowed to call the API ("*" allows any)
+    ALLOWED_ORIGINS: tuple[str, ...]
+
+    # Largest accepted /api/upload request body (character image + reference video)
+    MAX_UPLOAD_MB: int
+
+    # Server worker processes for `python main.py` (0 = choose automatically)
+    WEB_CONCURRENCY: int
+
+    # Application log level (DEBUG also logs Freepik request/response bodies)
+    LOG_LEVEL: str
+
+    @classmethod
+    def _load(cls) -> "Config":
+        """Build the config from os.environ"""
+        env = os.environ
+
+        api_base_url = env.get("FREEPIK_API_BASE_URL", "https://api.freepik.com/v1/ai/video")
+        runway_base_url = env.get("FREEPIK_RUNWAY_BASE_URL", api_base_url)
+
+        return cls(
+            MOCK_MODE=env.get("MOCK_MODE", "false").lower() == "true",
+            FREEPIK_API_KEY=env.get("FREEPIK_API_KEY", ""),
+            FREEPIK_API_BASE_URL=api_base_url,
+            FREEPIK_RUNWAY_BASE_URL=runway_base_url,
+            FREEPIK_RUNWAY_CREATE_URL=env.get(
+                "FREEPIK_RUNWAY_CREATE_URL",
+                f"{runway_base_url}/runway-act-two"
+            ),
+            FREEPIK_RUNWAY_STATUS_URL_TEMPLATE=env.get(
+                "FREEPIK_RUNWAY_STATUS_URL_TEMPLATE",
+                f"{runway_base_url}/runway-act-two/{{task_id}}"
+            ),
+            FREEPIK_SEEDREAM_EDIT_CREATE_URL=env.get(
+                "FREEPIK_SEEDREAM_EDIT_CREATE_URL",
+                "https://api.freepik.com/v1/ai/text-to-image/seedream-v4-edit"
+            ),
+            FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE=env.get(
+                "FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE",
+                "https://api.freepik.com/v1/ai/text-to-image/seedream-v4-edit/{task_id}"
+            ),
+            FREEPIK_KLING_CREATE_URL=env.get(
+                "FREEPIK_KLING_CREATE_URL",
+                "https://api.freepik.com/v1/ai/image-to-video/kling-v2-5-pro"
+            ),
+            FREEPIK_KLING_STATUS_URL_TEMPLATE=env.get(
+                "FREEPIK_KLING_STATUS_URL_TEMPLATE",
+                "https://api.freepik.com/v1/ai/image-to-video/kling-v2-5-pro/{task_id}"
+            ),
+            FREEPIK_MAX_CONCURRENCY=int(env.get("FREEPIK_MAX_CONCURRENCY", "32")),
+            FREEPIK_WEBHOOK_URL=env.get("FREEPIK_WEBHOOK_URL", ""),
+            FREEPIK_WEBHOOK_SECRET=env.get("FREEPIK_WEBHOOK_SECRET", ""),
+            FREEPIK_WEBHOOK_KEY=webhook_signing_key(env.get("FREEPIK_WEBHOOK_SECRET", "")),
+            CLOUDINARY_CLOUD_NAME=env.get("CLOUDINARY_CLOUD_NAME", ""),
+            CLOUDINARY_API_KEY=env.get("CLOUDINARY_API_KEY", ""),
+            CLOUDINARY_API_SECRET=env.get("CLOUDINARY_API_SECRET", ""),
+            REDIS_URL=env.get("REDIS_URL", ""),
+            ALLOWED_ORIGINS=tuple(
+                origin.strip()
+                for origin in env.get("ALLOWED_ORIGINS", "*").split(",")
+                if origin.strip()
+            ),
+            MAX_UPLOAD_MB=int(env.get("MAX_UPLOAD_MB", "2048")),
+            WEB_CONCURRENCY=int(env.get("WEB_CONCURRENCY", "0")),
+            LOG_LEVEL=env.get("LOG_LEVEL", "INFO").upper()
+        )
+
+
+CONFIG = Config._load()
+
+
+def compile_url_template(template: str) -> Optional[Callable[[str], str]]:
+    """
+    Split a "...{task_id}..." URL template once into a URL builder
+
+    Args:
+        template: URL template containing a {task_id} placeholder
+
+    Returns:
+        Callable building the URL for a task ID, or None if template is empty
+
+    Raises:
+        ValueError: If the template has no {task_id} placeholder
+    """
+    if not template:
+        return None
+
+    prefix, placeholder, suffix = template.partition("{task_id}")
+    if not placeholder:
+        raise ValueError(f"Status URL template has no {{task_id}} placeholder: {template}")
+
+    def build(task_id: str) -> str:
+        return f"{prefix}{task_id}{suffix}"
+
+    return build
+
+
+# Status URL builders for each model
+runway_status_url = compile_url_template(CONFIG.FREEPIK_RUNWAY_STATUS_URL_TEMPLATE)
+seedream_edit_status_url = compile_url_template(CONFIG.FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE)
+kling_status_url = compile_url_template(CONFIG.FREEPIK_KLING_STATUS_URL_TEMPLATE)
+
+
+# Freepik pushes task updates only when it is given the webhook URL, and
+# deliveries can only be verified with the secret, so both are required
+WEBHOOKS_ENABLED = bool(CONFIG.FREEPIK_WEBHOOK_URL and CONFIG.FREEPIK_WEBHOOK_SECRET)
+
+
+# Settings that must be non-empty outside mock mode
+_REQUIRED_VARS = (
+    "FREEPIK_API_KEY",
+    "CLOUDINARY_CLOUD_NAME",
+    "CLOUDINARY_API_KEY",
+    "CLOUDINARY_API_SECRET",
 )
 
-# Cloudinary
-CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME", "")
-CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY", "")
-CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET", "")
 
 # Validate required environment variables
 def validate_config():
     """Validate that all required environment variables are set"""
     # In mock mode, skip validation of API keys
-    if MOCK_MODE:
-        print("⚠️  MOCK MODE ENABLED - Skipping API key validation")
+    if CONFIG.MOCK_MODE:
+        logger.warning("⚠️  MOCK MODE ENABLED - Skipping API key validation")
         return
 
-    required_vars = {
-        "FREEPIK_API_KEY": FREEPIK_API_KEY,
-        "CLOUDINARY_CLOUD_NAME": CLOUDINARY_CLOUD_NAME,
-        "CLOUDINARY_API_KEY": CLOUDINARY_API_KEY,
-        "CLOUDINARY_API_SECRET": CLOUDINARY_API_SECRET,
-    }
-
-    missing_vars = [var for var, value in required_vars.items() if not value]
+    missing_vars = tuple(name for name in _REQUIRED_VARS if not getattr(CONFIG, name))
 
     if missing_vars:
         raise ValueError(
@@ -1,13 +1,30 @@
 """
 FastAPI application for character replacement video generation
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uuid
-from typing import Dict
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from types import MappingProxyType
+from typing import Annotated, Coroutine, Dict, List, Mapping, Optional, Set, Tuple
+import secrets
+
+import msgspec
+import msgspec.structs
+from cachetools import TTLCache
 
 from models import (
+    BatchStatusRequest,
+    BatchStatusResponse,
     GenerateRequest,
     GenerateResponse,
     UploadResponse,
@@ -17,47 +34,415 @@ from models import (
     ModelType,
     PipelineStage
 )
+from services import storage
+from services.storage import TaskRecord, UploadRecord, UpstreamStatus
 from services.cloudinary_service import upload_file
-from config import MOCK_MODE
-from services.freepik_service import freepik_client
+from config import CONFIG, WEBHOOKS_ENABLED
+from middleware import UploadLimitMiddleware
+from services.freepik_service import CREATE_DEADLINE_SECONDS, create_http_client, freepik_client
+
+logging.basicConfig(level=CONFIG.LOG_LEVEL, format="%(levelname)s %(name)s: %(message)s")
+# httpx logs every request at INFO; keep Freepik polls quiet unless debugging
+if logging.getLogger().getEffectiveLevel() > logging.DEBUG:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP/2 client for all Freepik calls, owned by the app
+    app.state.freepik_http = create_http_client()
+    await freepik_client.start(app.state.freepik_http)
+    yield
+    await freepik_client.aclose()
+    await app.state.freepik_http.aclose()
+    await storage.close()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Character Replacement MVP",
     description="API for replacing characters in videos using AI",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# Reject oversized uploads before they are spooled (added first so that CORS
+# headers are still set on the rejection)
+app.add_middleware(
+    UploadLimitMiddleware,
+    path="/api/upload",
+    max_bytes=CONFIG.MAX_UPLOAD_MB * 1024 * 1024
 )
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
+    allow_origins=list(CONFIG.ALLOWED_ORIGINS) or ["*"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# In-memory storage for uploads and tasks
-# In production, use Redis or a database
-uploads: Dict[str, dict] = {}
-tasks: Dict[str, dict] = {}
-
 # Map Freepik ratio values to Seedream aspect ratios
-SEEDREAM_ASPECT_MAP = {
+SEEDREAM_ASPECT_MAP = MappingProxyType({
     "1280:720": "widescreen_16_9",
     "720:1280": "social_story_9_16",
     "960:960": "square_1_1",
     "1104:832": "classic_4_3",
     "832:1104": "traditional_3_4",
     "1584:672": "widescreen_16_9"
-}
+})
+
+# Accepted upload content types
+_VALID_IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/webp"})
+_VALID_VIDEO_TYPES = frozenset({"video/mp4", "video/quicktime", "video/x-msvideo"})
+_VALID_FRAME_TYPES = frozenset({"image/jpeg", "image/png"})
+
+# Upstream status -> (API status, human-readable progress label) for
+# single-step tasks, so both are resolved with one lookup per poll
+_STATUS_INFO = MappingProxyType({
+    "CREATED": (TaskStatus.CREATED, "Uploaded"),
+    "IN_PROGRESS": (TaskStatus.IN_PROGRESS, "In Progress"),
+    "PROCESSING": (TaskStatus.PROCESSING, "Processing"),
+    "FINALIZING": (TaskStatus.FINALIZING, "Finalizing"),
+    "READY": (TaskStatus.READY, "Ready"),
+    "COMPLETED": (TaskStatus.COMPLETED, "Ready"),
+    "FAILED": (TaskStatus.FAILED, "Failed")
+})
+
+# TaskStatus members by value, for lookups without Enum construction
+_TASK_STATUSES = MappingProxyType({status.value: status for status in TaskStatus})
+
+# Upstream statuses that never change once reached
+_TERMINAL_STATUSES = frozenset({"READY", "COMPLETED", "FAILED"})
+
+# Polling hints (poll_after_seconds, max_wait_seconds) by pipeline stage.
+# Image edits finish in seconds; video generation takes minutes, so clients
+# may back off up to max_wait_seconds while the status does not change.
+_POLL_HINTS = MappingProxyType({
+    PipelineStage.FRAME_UPLOADED: (5, 10),
+    PipelineStage.IMAGE_EDIT_STARTED: (5, 10),
+    PipelineStage.IMAGE_EDIT_COMPLETED: (5, 10),
+    PipelineStage.VIDEO_STARTED: (10, 30),
+})
+_DEFAULT_POLL_HINT = (10, 30)
+# Random extra delay, as a fraction of the poll interval
+POLL_JITTER = 0.2
+
+# Cache-Control for finished tasks, whose status never changes again
+FINAL_STATUS_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# Upstream status cache: clients poll every few seconds, while Freepik task
+# state changes far less often, so repeated polls within the TTL reuse one
+# upstream result. Terminal results are kept much longer. Results are also
+# shared through storage so other workers reuse them.
+STATUS_CACHE_SECONDS = 2.0
+FINAL_STATUS_CACHE_SECONDS = 3600
+_status_cache = TTLCache(maxsize=10_000, ttl=STATUS_CACHE_SECONDS)
+_final_status_cache = TTLCache(maxsize=10_000, ttl=FINAL_STATUS_CACHE_SECONDS)
+
+# Freepik status requests in flight, by upstream task ID; concurrent pollers
+# await the same request instead of sending their own
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Encodes storage records (msgspec Structs) straight to JSON bytes
+_json_encode = msgspec.json.Encoder().encode
+
+
+# Pipeline stages during which the Seedream edit result is checked
+_IMAGE_EDIT_STAGES = frozenset({
+    PipelineStage.FRAME_UPLOADED,
+    PipelineStage.IMAGE_EDIT_STARTED,
+    PipelineStage.IMAGE_EDIT_COMPLETED,
+})
+
+# Pipeline stages after which a task never changes again
+_FINAL_PIPELINE_STAGES = frozenset({PipelineStage.PIPELINE_COMPLETED, PipelineStage.FAILED})
+
+# How long one poller may own launching a task's video stage; outlasts the
+# slowest possible create call, so the lock never expires mid-launch
+VIDEO_LAUNCH_LOCK_SECONDS = CREATE_DEADLINE_SECONDS + 30
+
+# Per-task locks (and their user counts, to drop idle locks) so concurrent
+# polls of one task do not overwrite each other's updates
+_task_locks: Dict[str, asyncio.Lock] = {}
+_task_lock_users: Counter = Counter()
+
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_background_tasks: Set[asyncio.Task] = set()
+
+# Webhook deliveries older than this are rejected (replay protection)
+WEBHOOK_TOLERANCE_SECONDS = 5 * 60
+
+# With webhooks enabled, Freepik is still polled when no update has arrived
+# for this long (a few poll intervals), so a lost delivery cannot stall a task
+WEBHOOK_STALE_SECONDS = 90
+
+_NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class FreepikTaskUpdate(msgspec.Struct):
+    """Task update sent to /api/webhook/freepik"""
+    task_id: _NonEmptyStr
+    status: _NonEmptyStr
+    generated: List[str] = []
+
+
+class FreepikWebhookEnvelope(msgspec.Struct):
+    """Webhook body with the update wrapped in "data" (it may also come bare)"""
+    data: Optional[FreepikTaskUpdate] = None
+
+
+async def fetch_upstream_status(upstream_task_id: str, model: str, force_refresh: bool = False) -> dict:
+    """
+    Get a Freepik task status, sharing one upstream call between concurrent
+    pollers of the same task
+
+    With webhooks configured, the status pushed to /api/webhook/freepik is
+    used; Freepik is only called when force_refresh is set or no update has
+    arrived for WEBHOOK_STALE_SECONDS.
+
+    Args:
+        upstream_task_id: Freepik task ID
+        model: Model identifier passed to the Freepik client
+        force_refresh: Ask Freepik even when webhooks are enabled
+
+    Returns:
+        dict: Result of freepik_client.get_task_status
+    """
+    cached = _final_status_cache.get(upstream_task_id) or _status_cache.get(upstream_task_id)
+    if cached is not None:
+        return cached
+
+    if WEBHOOKS_ENABLED and not force_refresh:
+        pushed = await storage.get_upstream_status(upstream_task_id)
+        if pushed is not None and (
+            pushed.status in _TERMINAL_STATUSES or time.time() - pushed.updated_at < WEBHOOK_STALE_SECONDS
+        ):
+            result = upstream_result(upstream_task_id, pushed)
+            if pushed.status in _TERMINAL_STATUSES:
+                _final_status_cache[upstream_task_id] = result
+            return result
+        # No update for a while (or none stored): poll instead, as below
+
+    request = _inflight.get(upstream_task_id)
+    if request is None:
+        request = asyncio.create_task(_request_upstream_status(upstream_task_id, model))
+        _inflight[upstream_task_id] = request
+        request.add_done_callback(lambda _: _inflight.pop(upstream_task_id, None))
+
+    # Shielded so a poller that disconnects does not cancel the shared request
+    return await asyncio.shield(request)
+
+
+async def _request_upstream_status(upstream_task_id: str, model: str) -> dict:
+    """Get a Freepik task status from the shared cache or Freepik, caching successes"""
+    polled = await storage.get_polled_status(upstream_task_id)
+    if polled is not None:
+        result = upstream_result(upstream_task_id, polled)
+    else:
+        result = await freepik_client.get_task_status(upstream_task_id, model=model)
+        if not result.get("success"):
+            return result
+
+    terminal = result["status"] in _TERMINAL_STATUSES
+    if terminal:
+        _final_status_cache[upstream_task_id] = result
+    else:
+        _status_cache[upstream_task_id] = result
+
+    if polled is None:
+        record = UpstreamStatus(status=result["status"], result_urls=result.get("result_urls") or [])
+        await storage.set_polled_status(
+            upstream_task_id,
+            record,
+            ex=FINAL_STATUS_CACHE_SECONDS if terminal else STATUS_CACHE_SECONDS
+        )
+        if WEBHOOKS_ENABLED:
+            # Counts as a fresh update, so the next fallback poll waits again
+            await store_upstream_status(upstream_task_id, record)
+    return result
+
+
+async def store_upstream_status(upstream_task_id: str, record: UpstreamStatus) -> bool:
+    """
+    Store a reported Freepik status, stamped with the current time; a final
+    status is never replaced by a running one (webhook retries may arrive
+    out of order)
+    """
+    record.updated_at = time.time()
+    terminal = record.status in _TERMINAL_STATUSES
+    return await storage.set_upstream_status(
+        upstream_task_id,
+        record,
+        lambda current: terminal or current.status not in _TERMINAL_STATUSES
+    )
+
+
+def upstream_result(upstream_task_id: str, record: UpstreamStatus) -> dict:
+    """Shape a stored Freepik status like a freepik_client.get_task_status result"""
+    return {
+        "success": True,
+        "task_id": upstream_task_id,
+        "status": record.status,
+        "result_urls": record.result_urls
+    }
+
+
+def run_in_background(coro: Coroutine) -> asyncio.Task:
+    """Start a coroutine without awaiting it, keeping it alive until done"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def launch_video_stage(task_id: str):
+    """
+    Start the Runway video stage of a pipeline task once its image edit is done
+
+    Runs in the background so that the poll which noticed the finished edit
+    does not wait for Freepik. The outcome is stored on the task record and
+    announced on the task events channel.
+
+    Args:
+        task_id: Pipeline task whose intermediate image is ready
+    """
+    task_data = await storage.get_task(task_id)
+    if task_data is None or task_data.runway_task_id:
+        return
+
+    settings = task_data.settings
+    video_result = await freepik_client.create_task(
+        character_url=task_data.intermediate_url,
+        reference_url=task_data.reference_url,
+        ratio=settings.get("ratio"),
+        expression_intensity=settings.get("expression_intensity", 3),
+        body_control=settings.get("body_control", True),
+        seed=settings.get("seed")
+    )
+
+    if video_result.get("success"):
+        if WEBHOOKS_ENABLED:
+            # Starts the clock for the polling fallback
+            await store_upstream_status(video_result["task_id"], UpstreamStatus(status=video_result["status"]))
+        updated = msgspec.structs.replace(
+            task_data,
+            runway_task_id=video_result["task_id"],
+            pipeline_stage=PipelineStage.VIDEO_STARTED,
+            status=video_result["status"]
+        )
+    elif video_result.get("retryable"):
+        # Nothing was created (circuit open, rate limit, no connection):
+        # stay at IMAGE_EDIT_COMPLETED and let the next poll launch again
+        logger.warning("[PIPELINE] Video stage launch for %s deferred: %s", task_id, video_result.get("error"))
+        await storage.release_lock(f"launch-video:{task_id}")
+        return
+    else:
+        logger.error("[PIPELINE] Video stage launch failed for %s: %s", task_id, video_result.get("error"))
+        updated = msgspec.structs.replace(task_data, pipeline_stage=PipelineStage.FAILED, status="FAILED")
+
+    # Record the launch only if no other launch got there first
+    stored = await storage.set_task_if(
+        task_id,
+        updated,
+        lambda current: current.pipeline_stage == PipelineStage.IMAGE_EDIT_COMPLETED and not current.runway_task_id
+    )
+    if not stored:
+        logger.error("[PIPELINE] Task %s moved on during video launch; dropping %s", task_id, video_result.get("task_id"))
+        return
+    await storage.publish_task_event(task_id)
+
+
+def verify_webhook_signature(headers: Mapping[str, str], body: bytes) -> bool:
+    """
+    Check a Freepik webhook signature
+
+    Freepik signs "{webhook-id}.{webhook-timestamp}.{body}" with HMAC-SHA256
+    and sends base64 signatures as "v1,<signature>" (space separated if
+    there are several) in the webhook-signature header.
+
+    Args:
+        headers: Request headers
+        body: Raw request body
+
+    Returns:
+        bool: True if one of the signatures matches and the delivery is recent
+    """
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature")
+    if not (webhook_id and timestamp and signatures):
+        return False
+
+    try:
+        if abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE_SECONDS:
+            return False
+    except (ValueError, OverflowError):
+        return False
+
+    signed = b".".join((webhook_id.encode(), timestamp.encode(), body))
+    expected = base64.b64encode(hmac.new(CONFIG.FREEPIK_WEBHOOK_KEY, signed, hashlib.sha256).digest()).decode()
+
+    return any(
+        hmac.compare_digest(signature.partition(",")[2], expected)
+        for signature in signatures.split()
+    )
+
+
+def resolve_status(value: str) -> Tuple[TaskStatus, str]:
+    """Map an upstream status to its API status and progress label."""
+    return _STATUS_INFO.get(value) or (TaskStatus.IN_PROGRESS, value)
+
+
+def task_is_final(model: ModelType, status: str, pipeline_stage: Optional[PipelineStage]) -> bool:
+    """Check whether a stored task has reached a status that never changes"""
+    if model == ModelType.RUNWAY_ACT_TWO:
+        return status in _TERMINAL_STATUSES
+    return pipeline_stage in _FINAL_PIPELINE_STAGES
+
+
+def status_etag(task_id: str, status: str) -> str:
+    """ETag of a finished task's status response"""
+    return '"%s"' % hashlib.sha1(f"{task_id}:{status}".encode()).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (weak comparison) against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def with_poll_hint(response: StatusResponse) -> StatusResponse:
+    """Add the (poll_after_seconds, max_wait_seconds) hint for a status response"""
+    if response.status.value in _TERMINAL_STATUSES:
+        return response
+    poll_after, max_wait = _POLL_HINTS.get(response.pipeline_stage, _DEFAULT_POLL_HINT)
+    return response.model_copy(update={"poll_after_seconds": poll_after, "max_wait_seconds": max_wait})
+
+
+def next_poll_delay(previous: Optional[float], response: StatusResponse, changed: bool) -> float:
+    """
+    Seconds until a running task is refreshed again
+
+    Starts at the hinted poll_after_seconds and doubles, up to
+    max_wait_seconds, for as long as the status does not change.
+    """
+    hinted = response.poll_after_seconds
+    if changed or previous is None:
+        return hinted
+    return max(hinted, min(previous * 2, response.max_wait_seconds or hinted))
 
 
 def coerce_task_status(value: str) -> TaskStatus:
     """Map unknown status strings to a safe default for API responses."""
-    if value in TaskStatus._value2member_map_:
-        return TaskStatus(value)
-    return TaskStatus.IN_PROGRESS
+    return _TASK_STATUSES.get(value, TaskStatus.IN_PROGRESS)
 
 
 @app.get("/")
@@ -85,58 +470,51 @@ async def upload_files(
     Returns:
         UploadResponse with upload_id and file URLs
     """
-    try:
-        # Validate file types
-        valid_image_types = ["image/jpeg", "image/png", "image/webp"]
-        valid_video_types = ["video/mp4", "video/quicktime", "video/x-msvideo"]
-
-        if character.content_type not in valid_image_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid character file type. Allowed: jpg, png, webp"
-            )
+    # Validate file types
+    if character.content_type not in _VALID_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid character file type. Allowed: jpg, png, webp"
+        )
 
-        if reference.content_type not in valid_video_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid reference file type. Allowed: mp4, mov, avi"
-            )
+    if reference.content_type not in _VALID_VIDEO_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid reference file type. Allowed: mp4, mov, avi"
+        )
 
-        # Upload character image
-        char_result = await upload_file(character, resource_type="image")
-        if not char_result.get("success"):
+    # Upload character image and reference video concurrently
+    char_result, ref_result = await asyncio.gather(
+        upload_file(character, resource_type="image"),
+        upload_file(reference, resource_type="video"),
+        return_exceptions=True
+    )
+    for name, result in (("character", char_result), ("reference", ref_result)):
+        if isinstance(result, Exception):
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to upload character: {char_result.get('error')}"
+                detail=f"Failed to upload {name}: {result}"
             )
-
-        # Upload reference video
-        ref_result = await upload_file(reference, resource_type="video")
-        if not ref_result.get("success"):
+        if not result.get("success"):
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to upload reference: {ref_result.get('error')}"
+                detail=f"Failed to upload {name}: {result.get('error')}"
             )
 
-        # Generate upload ID and store
-        upload_id = str(uuid.uuid4())
-        uploads[upload_id] = {
-            "character_url": char_result["url"],
-            "reference_url": ref_result["url"],
-            "character_public_id": char_result["public_id"],
-            "reference_public_id": ref_result["public_id"]
-        }
-
-        return UploadResponse(
-            upload_id=upload_id,
-            character_url=char_result["url"],
-            reference_url=ref_result["url"]
-        )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Generate upload ID and store
+    upload_id = secrets.token_urlsafe(16)
+    await storage.set_upload(upload_id, UploadRecord(
+        character_url=char_result["url"],
+        reference_url=ref_result["url"],
+        character_public_id=char_result["public_id"],
+        reference_public_id=ref_result["public_id"]
+    ))
+
+    return UploadResponse(
+        upload_id=upload_id,
+        character_url=char_result["url"],
+        reference_url=ref_result["url"]
+    )
 
 
 @app.post("/api/upload-frame")
@@ -150,33 +528,26 @@ async def upload_frame(file: UploadFile = File(..., description="Video frame ima
     Returns:
         dict with frame_url and public_id
     """
-    try:
-        if MOCK_MODE:
-            return {
-                "frame_url": "https://storage.googleapis.com/mock-frame-result.jpg",
-                "public_id": "mock-frame"
-            }
-
-        valid_image_types = ["image/jpeg", "image/png"]
-        if file.content_type not in valid_image_types:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid frame file type. Allowed: jpg, png"
-            )
+    if CONFIG.MOCK_MODE:
+        return {
+            "frame_url": "https://storage.googleapis.com/mock-frame-result.jpg",
+            "public_id": "mock-frame"
+        }
 
-        result = await upload_file(file, resource_type="image")
-        if not result.get("success"):
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to upload frame: {result.get('error')}"
-            )
+    if file.content_type not in _VALID_FRAME_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid frame file type. Allowed: jpg, png"
+        )
 
-        return {"frame_url": result["url"], "public_id": result["public_id"]}
+    result = await upload_file(file, resource_type="image")
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload frame: {result.get('error')}"
+        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"frame_url": result["url"], "public_id": result["public_id"]}
 
 
 @app.post("/api/generate", response_model=GenerateResponse)
@@ -194,348 +565,490 @@ async def generate_video(request: GenerateRequest):
     Returns:
         GenerateResponse with task_id and initial status
     """
-    try:
-        # Determine URLs based on mode
-        if request.upload_id:
-            upload_data = uploads.get(request.upload_id)
-            if not upload_data:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Upload not found: {request.upload_id}"
-                )
-            character_url = upload_data["character_url"]
-            reference_url = upload_data["reference_url"]
-        else:
-            character_url = request.direct_urls.character_url
-            reference_url = request.direct_urls.reference_url
-
-        # Route by model
-        if request.settings.model == ModelType.RUNWAY_ACT_TWO:
-            result = await freepik_client.create_task(
-                character_url=character_url,
-                reference_url=reference_url,
-                ratio=request.settings.ratio.value,
-                expression_intensity=request.settings.expression_intensity,
-                body_control=request.settings.body_control,
-                seed=request.settings.seed
+    # Determine URLs based on mode
+    if request.upload_id:
+        upload_data = await storage.get_upload(request.upload_id)
+        if upload_data is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Upload not found: {request.upload_id}"
             )
-        else:
-            frame_url = request.frame_url
-            if not frame_url:
-                raise HTTPException(
-                    status_code=400,
-                    detail="frame_url is required for pipeline model"
-                )
-
-            aspect_ratio = SEEDREAM_ASPECT_MAP.get(request.settings.ratio.value, "widescreen_16_9")
-            edit_result = await freepik_client.create_seedream_edit_task(
-                frame_url=frame_url,
-                character_url=character_url,
-                prompt=(
-                    "Reference image 1 is the frame. Reference image 2 is the character. "
-                    "Replace the person in reference image 1 with the person from reference image 2. "
-                    "Preserve the scene, actions, pose, lighting, and camera angle. "
-                    "Keep identity, facial structure, proportions, and hairstyle from reference image 2."
-                ),
-                aspect_ratio=aspect_ratio,
-                guidance_scale=7.5
+        character_url = upload_data.character_url
+        reference_url = upload_data.reference_url
+    else:
+        character_url = request.direct_urls.character_url
+        reference_url = request.direct_urls.reference_url
+
+    settings = request.settings
+
+    # Route by model
+    if settings.model == ModelType.RUNWAY_ACT_TWO:
+        result = await freepik_client.create_task(
+            character_url=character_url,
+            reference_url=reference_url,
+            ratio=settings.ratio.value,
+            expression_intensity=settings.expression_intensity,
+            body_control=settings.body_control,
+            seed=settings.seed
+        )
+    else:
+        frame_url = request.frame_url
+        if not frame_url:
+            raise HTTPException(
+                status_code=400,
+                detail="frame_url is required for pipeline model"
             )
 
-            if not edit_result.get("success"):
-                raise HTTPException(
-                    status_code=500,
-                    detail=edit_result.get("error")
-                )
-
-            result = {
-                "success": True,
-                "task_id": edit_result["task_id"],
-                "status": edit_result["status"],
-                "pipeline_stage": PipelineStage.IMAGE_EDIT_STARTED,
-                "seedream_task_id": edit_result["task_id"]
-            }
+        aspect_ratio = SEEDREAM_ASPECT_MAP.get(settings.ratio.value, "widescreen_16_9")
+        edit_result = await freepik_client.create_seedream_edit_task(
+            frame_url=frame_url,
+            character_url=character_url,
+            prompt=(
+                "Reference image 1 is the frame. Reference image 2 is the character. "
+                "Replace the person in reference image 1 with the person from reference image 2. "
+                "Preserve the scene, actions, pose, lighting, and camera angle. "
+                "Keep identity, facial structure, proportions, and hairstyle from reference image 2."
+            ),
+            aspect_ratio=aspect_ratio,
+            guidance_scale=7.5
+        )
 
-        if not result.get("success"):
+        if not edit_result.get("success"):
             raise HTTPException(
                 status_code=500,
-                detail=f"Failed to create task: {result.get('error')}"
+                detail=edit_result.get("error")
             )
 
-        task_id = result["task_id"]
-        tasks[task_id] = {
-            "upload_id": request.upload_id,
-            "direct_urls": request.direct_urls.model_dump() if request.direct_urls else None,
-            "character_url": character_url,
-            "reference_url": reference_url,
-            "status": result["status"],
-            "settings": request.settings.model_dump(),
-            "model": request.settings.model,
-            # pipeline extras
-            "frame_url": request.frame_url if request.settings.model == ModelType.SEEDREAM_RUNWAY else None,
-            "pipeline_stage": result.get("pipeline_stage"),
-            "seedream_task_id": result.get("seedream_task_id"),
-            "runway_task_id": None,
-            "intermediate_url": None,
-            "result_urls": []
+        result = {
+            "success": True,
+            "task_id": edit_result["task_id"],
+            "status": edit_result["status"],
+            "pipeline_stage": PipelineStage.IMAGE_EDIT_STARTED,
+            "seedream_task_id": edit_result["task_id"]
         }
 
-        return GenerateResponse(task_id=task_id, status=result["status"])
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create task: {result.get('error')}"
+        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    task_id = result["task_id"]
+    if WEBHOOKS_ENABLED:
+        # Starts the clock for the polling fallback
+        await store_upstream_status(task_id, UpstreamStatus(status=result["status"]))
+    await storage.set_task(task_id, TaskRecord(
+        upload_id=request.upload_id,
+        character_url=character_url,
+        reference_url=reference_url,
+        status=result["status"],
+        settings=settings.model_dump(mode="json"),
+        model=settings.model,
+        # pipeline extras
+        frame_url=request.frame_url if settings.model == ModelType.SEEDREAM_RUNWAY else None,
+        pipeline_stage=result.get("pipeline_stage"),
+        seedream_task_id=result.get("seedream_task_id")
+    ))
+
+    return GenerateResponse(task_id=task_id, status=result["status"])
 
 
 @app.get("/api/status/{task_id}", response_model=StatusResponse)
-async def get_task_status(task_id: str):
+async def get_task_status(task_id: str, request: Request, force_refresh: bool = False):
     """
     Get the status of a generation task
 
+    Finished tasks never change again, so their responses are cacheable and
+    carry an ETag; running tasks are sent with Cache-Control: no-store.
+
     Args:
         task_id: The task ID to check
+        force_refresh: Ask Freepik directly even when webhooks are enabled
 
     Returns:
-        StatusResponse with current status and result URLs if ready
+        StatusResponse with current status, result URLs if ready and a hint
+        for when to poll next (304 Not Modified if the client's copy is current)
+    """
+    # A finished task's stored status is final: revalidate without a refresh
+    stored = await storage.get_task_fields(task_id, "model", "status", "pipeline_stage")
+    if stored is not None and task_is_final(*stored):
+        etag = status_etag(task_id, coerce_task_status(stored[1]).value)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": FINAL_STATUS_CACHE_CONTROL})
+
+    status_response = with_poll_hint(await check_task_status(task_id, force_refresh))
+
+    # Built from trusted values, so skip response_model re-validation
+    if status_response.status.value not in _TERMINAL_STATUSES:
+        return ORJSONResponse(status_response.model_dump(mode="json"), headers={"Cache-Control": "no-store"})
+
+    etag = status_etag(task_id, status_response.status.value)
+    cache_headers = {"ETag": etag, "Cache-Control": FINAL_STATUS_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    return ORJSONResponse(status_response.model_dump(mode="json"), headers=cache_headers)
+
+
+@app.get("/api/events/{task_id}")
+async def stream_task_events(task_id: str):
     """
+    Stream status updates of a generation task as Server-Sent Events
+
+    Each update is a "status" event carrying a StatusResponse; the stream
+    ends after a terminal status or an "error" event. Updates are pushed when
+    a webhook or pipeline step announces the task, and the status is also
+    refreshed on the poll hint interval, backing off while it does not
+    change, in case no announcement comes.
+
+    Args:
+        task_id: The task ID to follow
+
+    Returns:
+        StreamingResponse: text/event-stream
+    """
+    if await storage.get_task(task_id) is None:
+        raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
+
+    return StreamingResponse(
+        _task_event_stream(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _task_event_stream(task_id: str):
+    """Yield SSE frames for a task until it finishes"""
+    announced: asyncio.Queue = asyncio.Queue()
+
+    async def listen():
+        async for changed_id in storage.subscribe_task_events():
+            announced.put_nowait(changed_id)
+
+    listener = asyncio.create_task(listen())
     try:
-        if task_id not in tasks:
-            raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
-
-        task_data = tasks[task_id]
-        model = task_data.get("model", ModelType.RUNWAY_ACT_TWO)
-
-        # Single-step RunWay
-        if model == ModelType.RUNWAY_ACT_TWO:
-            result = await freepik_client.get_task_status(task_id, model="runway_act_two")
-
-            if not result.get("success"):
-                if result.get("transient"):
-                    status = task_data.get("status", "IN_PROGRESS")
-                    progress_stage_map = {
-                        "CREATED": "Uploaded",
-                        "IN_PROGRESS": "In Progress",
-                        "PROCESSING": "Processing",
-                        "FINALIZING": "Finalizing",
-                        "READY": "Ready",
-                        "COMPLETED": "Ready",
-                        "FAILED": "Failed"
-                    }
-                    return StatusResponse(
-                        task_id=task_id,
-                        status=coerce_task_status(status),
-                        result_urls=task_data.get("result_urls", []),
-                        progress_stage=progress_stage_map.get(status, status),
-                        model_used=model
-                    )
+        last_sent = None
+        delay = None
+        while True:
+            try:
+                status_response = with_poll_hint(await check_task_status(task_id))
+            except HTTPException as e:
+                yield f"event: error\ndata: {msgspec.json.encode({'error': e.detail}).decode()}\n\n"
+                return
+
+            payload = status_response.model_dump_json()
+            changed = payload != last_sent
+            if changed:
+                yield f"event: status\ndata: {payload}\n\n"
+                last_sent = payload
+            else:
+                # Comment frame keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+
+            if status_response.poll_after_seconds is None:
+                return
+
+            # Jitter spreads out refreshes of streams opened at the same time
+            delay = next_poll_delay(delay, status_response, changed)
+            task_data = await storage.get_task(task_id)
+            watched = {task_id, task_data.seedream_task_id, task_data.runway_task_id} if task_data else {task_id}
+            await _wait_for_announcement(announced, watched, delay + random.uniform(0, delay * POLL_JITTER))
+    finally:
+        listener.cancel()
+
+
+async def _wait_for_announcement(announced: asyncio.Queue, watched: Set[str], timeout: float):
+    """Wait until one of the watched IDs is announced, or the timeout passes"""
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        try:
+            changed_id = await asyncio.wait_for(announced.get(), remaining)
+        except asyncio.TimeoutError:
+            return
+        if changed_id in watched:
+            return
+
+
+@app.post("/api/status/batch", response_model=BatchStatusResponse)
+async def get_batch_status(request: BatchStatusRequest):
+    """
+    Get the status of several generation tasks in one request
+
+    Tasks are checked concurrently; upstream calls share the pooled
+    HTTP/2 connection to Freepik.
+
+    Args:
+        request: Task IDs to check
+
+    Returns:
+        BatchStatusResponse with a status per task and errors for the rest
+    """
+    task_ids = list(dict.fromkeys(request.task_ids))
+    results = await asyncio.gather(
+        *(check_task_status(task_id) for task_id in task_ids),
+        return_exceptions=True
+    )
+
+    statuses = {}
+    errors = {}
+    for task_id, result in zip(task_ids, results):
+        if isinstance(result, HTTPException):
+            errors[task_id] = result.detail
+        elif isinstance(result, Exception):
+            logger.error("[BATCH STATUS] %s: %r", task_id, result, exc_info=result)
+            errors[task_id] = "Internal server error"
+        else:
+            statuses[task_id] = with_poll_hint(result)
+
+    return ORJSONResponse(BatchStatusResponse.model_construct(statuses=statuses, errors=errors).model_dump(mode="json"))
+
+
+@asynccontextmanager
+async def task_lock(task_id: str):
+    """Serialize read-modify-write of one task record within this worker"""
+    lock = _task_locks.setdefault(task_id, asyncio.Lock())
+    _task_lock_users[task_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _task_lock_users[task_id] -= 1
+        if not _task_lock_users[task_id]:
+            del _task_lock_users[task_id]
+            _task_locks.pop(task_id, None)
+
+
+async def check_task_status(task_id: str, force_refresh: bool = False) -> StatusResponse:
+    """Refresh a task from upstream, advancing the pipeline when a stage completes"""
+    async with task_lock(task_id):
+        return await _refresh_task_status(task_id, force_refresh)
+
+
+async def _refresh_task_status(task_id: str, force_refresh: bool) -> StatusResponse:
+    # Single-step tasks only need these fields, so skip loading the whole record
+    fields = await storage.get_task_fields(task_id, "model", "status", "result_urls")
+    if fields is None:
+        raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
+
+    model, stored_status, result_urls = fields
+
+    # Single-step RunWay
+    if model == ModelType.RUNWAY_ACT_TWO:
+        # A finished task never changes again; answer from the stored record
+        if stored_status not in _TERMINAL_STATUSES:
+            result = await fetch_upstream_status(task_id, model="runway_act_two", force_refresh=force_refresh)
+
+            if result.get("success"):
+                refreshed = (result["status"], result.get("result_urls") or result_urls)
+                if refreshed != (stored_status, result_urls):
+                    stored_status, result_urls = refreshed
+                    await storage.update_task_fields(task_id, status=stored_status, result_urls=result_urls)
+            elif not result.get("transient"):
                 raise HTTPException(status_code=500, detail=result.get("error"))
+            # On transient errors report the stored state
 
-            status = result["status"]
-            result_urls = result.get("result_urls", [])
+        status, progress_stage = resolve_status(stored_status)
+        return StatusResponse.model_construct(
+            task_id=task_id,
+            status=status,
+            result_urls=result_urls,
+            progress_stage=progress_stage,
+            model_used=model
+        )
 
-            task_data["status"] = status
-            if result_urls:
-                task_data["result_urls"] = result_urls
+    task_data = await storage.get_task(task_id)
+    if task_data is None:
+        raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
 
-            progress_stage_map = {
-                "CREATED": "Uploaded",
-                "IN_PROGRESS": "In Progress",
-                "PROCESSING": "Processing",
-                "FINALIZING": "Finalizing",
-                "READY": "Ready",
-                "COMPLETED": "Ready",
-                "FAILED": "Failed"
-            }
+    # Pipeline flow: Seedream 4 Edit → Runway Act Two
+    pipeline_stage = task_data.pipeline_stage or PipelineStage.IMAGE_EDIT_STARTED
 
-            return StatusResponse(
-                task_id=task_id,
-                status=coerce_task_status(status),
-                result_urls=result_urls,
-                progress_stage=progress_stage_map.get(status, status),
-                model_used=model
-            )
+    # Stage 1: Check Seedream Edit
+    if pipeline_stage in _IMAGE_EDIT_STAGES:
+        seedream_task_id = task_data.seedream_task_id
+        edit_result = await fetch_upstream_status(seedream_task_id, model="seedream_edit", force_refresh=force_refresh)
 
-        # Pipeline flow: Seedream 4 Edit → Runway Act Two
-        pipeline_stage = task_data.get("pipeline_stage", PipelineStage.IMAGE_EDIT_STARTED)
-
-        # Stage 1: Check Seedream Edit
-        if pipeline_stage in [PipelineStage.IMAGE_EDIT_STARTED, PipelineStage.FRAME_UPLOADED]:
-            seedream_task_id = task_data.get("seedream_task_id")
-            edit_result = await freepik_client.get_task_status(seedream_task_id, model="seedream_edit")
-
-            if not edit_result.get("success"):
-                if edit_result.get("transient"):
-                    return StatusResponse(
-                        task_id=task_id,
-                        status=coerce_task_status(task_data.get("status", "IN_PROGRESS")),
-                        progress_stage=task_data.get("status", "IN_PROGRESS"),
-                        pipeline_stage=pipeline_stage,
-                        frame_url=task_data.get("frame_url"),
-                        intermediate_url=task_data.get("intermediate_url"),
-                        result_urls=task_data.get("result_urls", []),
-                        model_used=model
-                    )
-                raise HTTPException(status_code=500, detail=edit_result.get("error"))
-
-            edit_status = edit_result["status"]
-
-            # Completed -> launch Kling
-            if edit_status == "COMPLETED":
-                intermediate_url = edit_result.get("result_urls", [None])[0]
-                task_data["intermediate_url"] = intermediate_url
-                task_data["pipeline_stage"] = PipelineStage.IMAGE_EDIT_COMPLETED
-
-                if task_data.get("runway_task_id"):
-                    return StatusResponse(
-                        task_id=task_id,
-                        status=coerce_task_status(task_data.get("status", "IN_PROGRESS")),
-                        progress_stage="VIDEO_STARTED",
-                        pipeline_stage=PipelineStage.VIDEO_STARTED,
-                        frame_url=task_data.get("frame_url"),
-                        intermediate_url=intermediate_url,
-                        result_urls=task_data.get("result_urls", []),
-                        model_used=model
-                    )
-
-                ratio = task_data.get("settings", {}).get("ratio")
-                if hasattr(ratio, "value"):
-                    ratio = ratio.value
-
-                video_result = await freepik_client.create_task(
-                    character_url=intermediate_url,
-                    reference_url=task_data.get("reference_url"),
-                    ratio=ratio,
-                    expression_intensity=task_data.get("settings", {}).get("expression_intensity", 3),
-                    body_control=task_data.get("settings", {}).get("body_control", True),
-                    seed=task_data.get("settings", {}).get("seed")
+        if not edit_result.get("success"):
+            if edit_result.get("transient"):
+                return StatusResponse.model_construct(
+                    task_id=task_id,
+                    status=coerce_task_status(task_data.status),
+                    progress_stage=task_data.status,
+                    pipeline_stage=pipeline_stage,
+                    frame_url=task_data.frame_url,
+                    intermediate_url=task_data.intermediate_url,
+                    result_urls=task_data.result_urls,
+                    model_used=model
                 )
+            raise HTTPException(status_code=500, detail=edit_result.get("error"))
 
-                if not video_result.get("success"):
-                    task_data["pipeline_stage"] = PipelineStage.FAILED
-                    tasks[task_id] = task_data
-                    raise HTTPException(status_code=500, detail=video_result.get("error"))
+        edit_status = edit_result["status"]
 
-                task_data["runway_task_id"] = video_result["task_id"]
-                task_data["pipeline_stage"] = PipelineStage.VIDEO_STARTED
-                task_data["status"] = video_result["status"]
-                tasks[task_id] = task_data
+        # Completed -> launch the video stage in the background
+        if edit_status == "COMPLETED":
+            intermediate_url = edit_result.get("result_urls", [None])[0]
 
-                return StatusResponse(
+            if task_data.runway_task_id:
+                return StatusResponse.model_construct(
                     task_id=task_id,
-                    status=coerce_task_status(video_result["status"]),
+                    status=coerce_task_status(task_data.status),
                     progress_stage="VIDEO_STARTED",
                     pipeline_stage=PipelineStage.VIDEO_STARTED,
-                    frame_url=task_data.get("frame_url"),
+                    frame_url=task_data.frame_url,
                     intermediate_url=intermediate_url,
-                    result_urls=[],
+                    result_urls=task_data.result_urls,
                     model_used=model
                 )
 
-            if edit_status == "FAILED":
-                task_data["pipeline_stage"] = PipelineStage.FAILED
-                task_data["status"] = edit_status
-                tasks[task_id] = task_data
-                return StatusResponse(
-                    task_id=task_id,
-                    status=TaskStatus.FAILED,
-                    progress_stage="FAILED",
-                    pipeline_stage=PipelineStage.FAILED,
-                    model_used=model
+            # Only the poller holding the lock launches; if the launch never
+            # finishes, the lock expires and a later poll retries
+            if await storage.acquire_lock(f"launch-video:{task_id}", ex=VIDEO_LAUNCH_LOCK_SECONDS):
+                await storage.update_task(
+                    task_id,
+                    task_data,
+                    intermediate_url=intermediate_url,
+                    pipeline_stage=PipelineStage.IMAGE_EDIT_COMPLETED
                 )
+                run_in_background(launch_video_stage(task_id))
 
-            # Still running
-            task_data["status"] = edit_status
-            tasks[task_id] = task_data
-            return StatusResponse(
+            return StatusResponse.model_construct(
                 task_id=task_id,
-                status=coerce_task_status(edit_status),
-                progress_stage=edit_status,
-                pipeline_stage=pipeline_stage,
-                frame_url=task_data.get("frame_url"),
+                status=coerce_task_status(task_data.status),
+                progress_stage="IMAGE_EDIT_COMPLETED",
+                pipeline_stage=PipelineStage.IMAGE_EDIT_COMPLETED,
+                frame_url=task_data.frame_url,
+                intermediate_url=intermediate_url,
+                result_urls=task_data.result_urls,
                 model_used=model
             )
 
-        # Stage 2: Check Kling
-        if pipeline_stage == PipelineStage.VIDEO_STARTED:
-            runway_task_id = task_data.get("runway_task_id")
-            video_result = await freepik_client.get_task_status(runway_task_id, model="runway_act_two")
-
-            if not video_result.get("success"):
-                if video_result.get("transient"):
-                    return StatusResponse(
-                        task_id=task_id,
-                        status=coerce_task_status(task_data.get("status", "IN_PROGRESS")),
-                        progress_stage=task_data.get("status", "IN_PROGRESS"),
-                        pipeline_stage=pipeline_stage,
-                        frame_url=task_data.get("frame_url"),
-                        intermediate_url=task_data.get("intermediate_url"),
-                        result_urls=task_data.get("result_urls", []),
-                        model_used=model
-                    )
-                raise HTTPException(status_code=500, detail=video_result.get("error"))
-
-            video_status = video_result["status"]
-
-            if video_status == "COMPLETED":
-                result_urls = video_result.get("result_urls", [])
-                task_data["pipeline_stage"] = PipelineStage.PIPELINE_COMPLETED
-                task_data["status"] = video_status
-                if result_urls:
-                    task_data["result_urls"] = result_urls
-                tasks[task_id] = task_data
-
-                return StatusResponse(
-                    task_id=task_id,
-                    status=TaskStatus.COMPLETED,
-                    progress_stage="PIPELINE_COMPLETED",
-                    pipeline_stage=PipelineStage.PIPELINE_COMPLETED,
-                    frame_url=task_data.get("frame_url"),
-                    intermediate_url=task_data.get("intermediate_url"),
-                    result_urls=result_urls,
-                    model_used=model
-                )
+        if edit_status == "FAILED":
+            await storage.update_task(task_id, task_data, pipeline_stage=PipelineStage.FAILED, status=edit_status)
+            return StatusResponse.model_construct(
+                task_id=task_id,
+                status=TaskStatus.FAILED,
+                progress_stage="FAILED",
+                pipeline_stage=PipelineStage.FAILED,
+                model_used=model
+            )
+
+        # Still running
+        await storage.update_task(task_id, task_data, status=edit_status)
+        return StatusResponse.model_construct(
+            task_id=task_id,
+            status=coerce_task_status(edit_status),
+            progress_stage=edit_status,
+            pipeline_stage=pipeline_stage,
+            frame_url=task_data.frame_url,
+            model_used=model
+        )
+
+    # Stage 2: Check Kling
+    if pipeline_stage == PipelineStage.VIDEO_STARTED:
+        runway_task_id = task_data.runway_task_id
+        video_result = await fetch_upstream_status(runway_task_id, model="runway_act_two", force_refresh=force_refresh)
 
-            if video_status == "FAILED":
-                task_data["pipeline_stage"] = PipelineStage.FAILED
-                task_data["status"] = video_status
-                tasks[task_id] = task_data
-                return StatusResponse(
+        if not video_result.get("success"):
+            if video_result.get("transient"):
+                return StatusResponse.model_construct(
                     task_id=task_id,
-                    status=TaskStatus.FAILED,
-                    progress_stage="FAILED",
-                    pipeline_stage=PipelineStage.FAILED,
-                    intermediate_url=task_data.get("intermediate_url"),
+                    status=coerce_task_status(task_data.status),
+                    progress_stage=task_data.status,
+                    pipeline_stage=pipeline_stage,
+                    frame_url=task_data.frame_url,
+                    intermediate_url=task_data.intermediate_url,
+                    result_urls=task_data.result_urls,
                     model_used=model
                 )
+            raise HTTPException(status_code=500, detail=video_result.get("error"))
+
+        video_status = video_result["status"]
+
+        if video_status == "COMPLETED":
+            result_urls = video_result.get("result_urls", [])
+            await storage.update_task(
+                task_id,
+                task_data,
+                pipeline_stage=PipelineStage.PIPELINE_COMPLETED,
+                status=video_status,
+                result_urls=result_urls or task_data.result_urls
+            )
+
+            return StatusResponse.model_construct(
+                task_id=task_id,
+                status=TaskStatus.COMPLETED,
+                progress_stage="PIPELINE_COMPLETED",
+                pipeline_stage=PipelineStage.PIPELINE_COMPLETED,
+                frame_url=task_data.frame_url,
+                intermediate_url=task_data.intermediate_url,
+                result_urls=result_urls,
+                model_used=model
+            )
 
-            task_data["status"] = video_status
-            tasks[task_id] = task_data
-            return StatusResponse(
+        if video_status == "FAILED":
+            await storage.update_task(task_id, task_data, pipeline_stage=PipelineStage.FAILED, status=video_status)
+            return StatusResponse.model_construct(
                 task_id=task_id,
-                status=coerce_task_status(video_status),
-                progress_stage=video_status,
-                pipeline_stage=PipelineStage.VIDEO_STARTED,
-                intermediate_url=task_data.get("intermediate_url"),
-                frame_url=task_data.get("frame_url"),
+                status=TaskStatus.FAILED,
+                progress_stage="FAILED",
+                pipeline_stage=PipelineStage.FAILED,
+                intermediate_url=task_data.intermediate_url,
                 model_used=model
             )
 
-        # Fallback
-        return StatusResponse(
+        await storage.update_task(task_id, task_data, status=video_status)
+        return StatusResponse.model_construct(
             task_id=task_id,
-            status=TaskStatus(task_data.get("status", TaskStatus.PROCESSING)),
-            progress_stage=str(task_data.get("pipeline_stage", "PROCESSING")),
-            pipeline_stage=task_data.get("pipeline_stage"),
-            frame_url=task_data.get("frame_url"),
-            intermediate_url=task_data.get("intermediate_url"),
-            result_urls=task_data.get("result_urls", []),
+            status=coerce_task_status(video_status),
+            progress_stage=video_status,
+            pipeline_stage=PipelineStage.VIDEO_STARTED,
+            intermediate_url=task_data.intermediate_url,
+            frame_url=task_data.frame_url,
             model_used=model
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Fallback
+    return StatusResponse.model_construct(
+        task_id=task_id,
+        status=coerce_task_status(task_data.status),
+        progress_stage=task_data.pipeline_stage.value if task_data.pipeline_stage else "PROCESSING",
+        pipeline_stage=task_data.pipeline_stage,
+        frame_url=task_data.frame_url,
+        intermediate_url=task_data.intermediate_url,
+        result_urls=task_data.result_urls,
+        model_used=model
+    )
+
+
+@app.post("/api/webhook/freepik")
+async def freepik_webhook(request: Request):
+    """
+    Receive a Freepik task update
+
+    The status is stored for /api/status and announced on the task events
+    channel, so pollers no longer have to call Freepik themselves.
+
+    Returns:
+        dict: Acknowledgement
+    """
+    if not WEBHOOKS_ENABLED:
+        raise HTTPException(status_code=404, detail="Webhooks are not configured")
+
+    body = await request.body()
+    if not verify_webhook_signature(request.headers, body):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        update = msgspec.json.decode(body, type=FreepikWebhookEnvelope).data
+        if update is None:
+            update = msgspec.json.decode(body, type=FreepikTaskUpdate)
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid task update: {e}")
+    except msgspec.DecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    await store_upstream_status(update.task_id, UpstreamStatus(status=update.status, result_urls=update.generated))
+    return {"received": True}
 
 
 @app.get("/api/tasks")
@@ -543,19 +1056,35 @@ async def list_tasks():
     """
     List all tasks (for debugging)
 
+    The body is streamed batch by batch, so the full set of records is never
+    held in memory or encoded in one go.
+
     Returns:
-        dict: All tasks in storage
+        StreamingResponse: JSON object {"tasks": {...}, "uploads": {...}}
     """
-    return {
-        "tasks": tasks,
-        "uploads": uploads
-    }
+    return StreamingResponse(_stream_records(), media_type="application/json")
+
+
+async def _stream_records():
+    """Yield the /api/tasks JSON body one storage batch at a time"""
+    for section, batches in ((b'{"tasks":{', storage.iter_tasks()), (b'},"uploads":{', storage.iter_uploads())):
+        yield section
+        sep = b""
+        async for batch in batches:
+            if not batch:
+                continue
+            yield sep + b",".join(
+                _json_encode(record_id) + b":" + _json_encode(record)
+                for record_id, record in batch
+            )
+            sep = b","
+    yield b"}}"
 
 
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"error": exc.detail}
     )
@@ -563,12 +1092,28 @@ async def http_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    return JSONResponse(
+    # Details stay in the server log (the exception is re-raised after this
+    # handler) rather than leaking internals to the client
+    return ORJSONResponse(
         status_code=500,
-        content={"error": "Internal server error", "details": str(exc)}
+        content={"error": "Internal server error"}
     )
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # Workers only share uploads/tasks through Redis, so without it
+    # default to a single worker
+    workers = CONFIG.WEB_CONCURRENCY or ((os.cpu_count() or 1) if CONFIG.REDIS_URL else 1)
+
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        # "auto" picks uvloop and httptools when installed (uvicorn[standard])
+        loop="auto",
+        http="auto",
+        access_log=False
+    )
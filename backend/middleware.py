@@ -0,0 +1,64 @@
+"""
+ASGI middleware for request guards
+"""
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class UploadLimitMiddleware:
+    """
+    Reject oversized or non-multipart uploads before the body is parsed
+
+    The multipart parser spools the whole body to disk before the route runs,
+    so a declared Content-Length over the limit is rejected up front, and
+    bodies without one are cut off once the limit is exceeded.
+    """
+
+    def __init__(self, app: ASGIApp, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] != self.path or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self._reject(415, "Expected multipart/form-data", scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                await self._reject(400, "Invalid Content-Length", scope, receive, send)
+                return
+            if declared > self.max_bytes:
+                await self._reject(413, self._too_large(), scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=self._too_large())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _too_large(self) -> str:
+        return f"Upload exceeds {self.max_bytes // (1024 * 1024)} MB"
+
+    @staticmethod
+    async def _reject(status_code: int, error: str, scope: Scope, receive: Receive, send: Send):
+        response = ORJSONResponse(status_code=status_code, content={"error": error})
+        await response(scope, receive, send)
@@ -1,10 +1,15 @@
 """
 Pydantic models for request/response validation
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, Optional, List
 from enum import Enum
 
+# Request/response models are immutable after validation; unknown fields are
+# dropped. Pydantic builds each validator when the class is defined, so there
+# is no schema construction left for the first request.
+_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore", validate_assignment=False)
+
 
 class ModelType(str, Enum):
     """Поддерживаемые AI модели"""
@@ -36,6 +41,8 @@ class AspectRatio(str, Enum):
 
 class GenerationSettings(BaseModel):
     """Settings for video generation"""
+    model_config = _MODEL_CONFIG
+
     model: ModelType = Field(default=ModelType.RUNWAY_ACT_TWO)
     ratio: AspectRatio = Field(default=AspectRatio.WIDESCREEN_16_9)
     expression_intensity: int = Field(default=3, ge=1, le=5)
@@ -45,6 +52,8 @@ class GenerationSettings(BaseModel):
 
 class UploadResponse(BaseModel):
     """Response from file upload"""
+    model_config = _MODEL_CONFIG
+
     upload_id: str
     character_url: str
     reference_url: str
@@ -52,12 +61,16 @@ class UploadResponse(BaseModel):
 
 class DirectUrls(BaseModel):
     """Direct URLs for character and reference"""
+    model_config = _MODEL_CONFIG
+
     character_url: str = Field(..., description="Direct URL to character image")
     reference_url: str = Field(..., description="Direct URL to reference video")
 
 
 class GenerateRequest(BaseModel):
     """Request to generate a video - supports either upload_id or direct URLs"""
+    model_config = _MODEL_CONFIG
+
     upload_id: Optional[str] = Field(default=None, description="Upload ID from /api/upload")
     direct_urls: Optional[DirectUrls] = Field(default=None, description="Direct URLs (skip upload)")
     settings: GenerationSettings
@@ -73,6 +86,8 @@ class GenerateRequest(BaseModel):
 
 class GenerateResponse(BaseModel):
     """Response from video generation"""
+    model_config = _MODEL_CONFIG
+
     task_id: str
     status: str
 
@@ -90,6 +105,8 @@ class TaskStatus(str, Enum):
 
 class StatusResponse(BaseModel):
     """Response from status check"""
+    model_config = _MODEL_CONFIG
+
     task_id: str
     status: TaskStatus
     result_urls: List[str] = Field(default_factory=list)
@@ -99,9 +116,29 @@ class StatusResponse(BaseModel):
     frame_url: Optional[str] = None  # URL извлечённого кадра
     intermediate_url: Optional[str] = None  # URL после Seedream Edit (новая картинка)
     model_used: Optional[ModelType] = None
+    # Подсказка клиенту: когда опрашивать снова (нет значения - опрос завершён)
+    poll_after_seconds: Optional[int] = None
+    max_wait_seconds: Optional[int] = None
+
+
+class BatchStatusRequest(BaseModel):
+    """Request to check several tasks at once"""
+    model_config = _MODEL_CONFIG
+
+    task_ids: List[str] = Field(..., min_length=1, max_length=50, description="Task IDs to check (up to 50)")
+
+
+class BatchStatusResponse(BaseModel):
+    """Statuses of several tasks, plus errors for tasks that could not be checked"""
+    model_config = _MODEL_CONFIG
+
+    statuses: Dict[str, StatusResponse] = Field(default_factory=dict)
+    errors: Dict[str, str] = Field(default_factory=dict)
 
 
 class ErrorResponse(BaseModel):
     """Error response"""
+    model_config = _MODEL_CONFIG
+
     error: str
     details: Optional[str] = None
@@ -0,0 +1,53 @@
+"""
+Circuit breaker for outbound API calls
+
+State lives in the storage service, so with Redis every worker sees the
+same failure count and open circuit.
+"""
+import logging
+import time
+from services import storage
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream API keeps failing
+
+    After `failure_threshold` consecutive transient failures the circuit opens
+    and calls are refused for `open_seconds`. Afterwards calls go through
+    again (half-open): one more failure reopens it, a success closes it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, open_seconds: int = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._failures_key = f"{name}:failures"
+        self._open_key = f"{name}:open"
+        # Known open-until time, so refused calls skip the storage round-trip
+        self._open_until = 0.0
+
+    async def allow(self) -> bool:
+        """Check whether a call may go through"""
+        if time.monotonic() < self._open_until:
+            return False
+        if await storage.is_locked(self._open_key):
+            self._open_until = time.monotonic() + 1.0
+            return False
+        return True
+
+    async def record_success(self):
+        """Close the circuit after a successful call"""
+        # Any worker's success ends the run of consecutive failures, including
+        # failures counted by other workers
+        await storage.reset_counter(self._failures_key)
+
+    async def record_failure(self):
+        """Count a transient failure, opening the circuit at the threshold"""
+        failures = await storage.increment_counter(self._failures_key, ex=self.open_seconds * 10)
+        if failures >= self.failure_threshold:
+            await storage.acquire_lock(self._open_key, ex=self.open_seconds)
+            self._open_until = time.monotonic() + self.open_seconds
+            logger.warning("Circuit %s open for %ss after %s failures", self.name, self.open_seconds, failures)
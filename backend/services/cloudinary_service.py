@@ -1,18 +1,22 @@
 """
 Cloudinary service for uploading files and getting public URLs
 """
+import asyncio
 import cloudinary
 import cloudinary.uploader
 from fastapi import UploadFile
-from config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+from config import CONFIG
 
 # Configure Cloudinary
 cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET
+    cloud_name=CONFIG.CLOUDINARY_CLOUD_NAME,
+    api_key=CONFIG.CLOUDINARY_API_KEY,
+    api_secret=CONFIG.CLOUDINARY_API_SECRET
 )
 
+# Files are streamed to Cloudinary in chunks of this size
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
 
 async def upload_file(file: UploadFile, resource_type: str = "auto") -> dict:
     """
@@ -26,12 +30,14 @@ async def upload_file(file: UploadFile, resource_type: str = "auto") -> dict:
         dict: Cloudinary upload result containing secure_url and other metadata
     """
     try:
-        # Read file contents
-        contents = await file.read()
-
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            contents,
+        # Stream the spooled upload in chunks from a worker thread instead of
+        # reading it into memory and blocking the event loop
+        await file.seek(0)
+        result = await asyncio.to_thread(
+            cloudinary.uploader.upload_large,
+            file.file,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            filename=file.filename or "upload",
             resource_type=resource_type,
             folder="character-replacement-mvp"  # Organize files in a folder
         )
@@ -64,7 +70,11 @@ async def delete_file(public_id: str, resource_type: str = "image"):
         dict: Result of the deletion
     """
     try:
-        result = cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+        result = await asyncio.to_thread(
+            cloudinary.uploader.destroy,
+            public_id,
+            resource_type=resource_type
+        )
         return {"success": True, "result": result}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -1,35 +1,231 @@
 """
 Freepik API service for character replacement video generation
 """
+import asyncio
+import functools
+import logging
+import random
 import httpx
+import msgspec
+from types import MappingProxyType
 from typing import Dict, Optional
-from config import (
-    FREEPIK_API_KEY,
-    FREEPIK_RUNWAY_CREATE_URL,
-    FREEPIK_RUNWAY_STATUS_URL_TEMPLATE,
-    FREEPIK_SEEDREAM_EDIT_CREATE_URL,
-    FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE,
-    FREEPIK_KLING_CREATE_URL,
-    FREEPIK_KLING_STATUS_URL_TEMPLATE,
-    MOCK_MODE
-)
+from config import CONFIG, WEBHOOKS_ENABLED, runway_status_url, seedream_edit_status_url, kling_status_url
+from services.circuit_breaker import CircuitBreaker
+
+# Request/response dumps are logged at DEBUG, off unless LOG_LEVEL=DEBUG, so
+# status polls do no synchronous console writes
+logger = logging.getLogger(__name__)
+
+# Sent with every Freepik request; set once on the pooled client
+FREEPIK_HEADERS = MappingProxyType({
+    "x-freepik-api-key": CONFIG.FREEPIK_API_KEY,
+    "Content-Type": "application/json"
+})
+
+# Request payloads and responses go through msgspec rather than httpx's
+# stdlib json
+_json_encode = msgspec.json.Encoder().encode
+_json_decode = msgspec.json.Decoder().decode
+
+# Connection attempts that take longer mean Freepik is unreachable
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Idle connection lifetime; above the longest poll interval (30s + jitter)
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+# Task creation retries: statuses worth retrying, attempts and backoff.
+# Only failures where Freepik cannot have created the task are retried, so
+# a retry never starts a duplicate (billed) generation.
+RETRY_STATUS_CODES = frozenset({429, 503})
+CREATE_MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 10.0
+# Upper bound on one create call, queueing and retries included; callers
+# holding a lock around a create keep it longer than this
+CREATE_DEADLINE_SECONDS = 90
+
+# Returned instead of calling Freepik while the circuit breaker is open
+_CIRCUIT_OPEN = MappingProxyType({
+    "success": False,
+    "error": "Freepik API temporarily unavailable, try again shortly",
+    "transient": True,
+    "retryable": True
+})
+
+
+def guarded(method):
+    """
+    Run a Freepik API call behind the client's circuit breaker; transient
+    failures (429, 5xx, network errors) count towards opening the circuit,
+    successes close it
+
+    Task creation results also carry "retryable": whether the call can be
+    made again without risking a second task (see create_may_retry).
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs) -> Dict:
+        if not await self._breaker.allow():
+            return dict(_CIRCUIT_OPEN)
+
+        result = await method(self, *args, **kwargs)
+
+        if result.get("success"):
+            await self._breaker.record_success()
+        elif result.get("transient"):
+            await self._breaker.record_failure()
+        return result
+
+    return wrapper
+
+
+# Network errors raised before the request reached Freepik
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def is_transient(status_code: int) -> bool:
+    """Whether an HTTP error status may succeed when tried again later"""
+    return status_code == 429 or 500 <= status_code < 600
+
+
+def create_may_retry(error: httpx.HTTPError) -> bool:
+    """
+    Whether a failed task creation is safe to try again later
+
+    Only failures where Freepik cannot have created the task qualify;
+    after other 5xx errors or read timeouts the task may exist, and a new
+    attempt would start a second (billed) generation.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS_CODES
+    return isinstance(error, _NOT_SENT_ERRORS)
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based)
+
+    Honors a Retry-After header in seconds, otherwise backs off
+    exponentially with jitter; capped at RETRY_MAX_SECONDS.
+    """
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), RETRY_MAX_SECONDS)
+    delay = RETRY_BASE_SECONDS * 2 ** attempt
+    return min(delay + random.uniform(0, delay), RETRY_MAX_SECONDS)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP/2 client for Freepik calls
+
+    Status polls for different tasks multiplex over the same kept-alive
+    connections instead of paying a TLS handshake each time. The pool is
+    sized to the per-worker request limit, and idle connections are kept
+    longer than the slowest poll interval (httpx's default is 5s), so
+    periodic polls find a connection still open.
+    """
+    return httpx.AsyncClient(
+        headers=dict(FREEPIK_HEADERS),
+        http2=True,
+        # Fail fast on an unreachable host; generation requests may still
+        # take a while to answer
+        timeout=httpx.Timeout(30.0, connect=CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=CONFIG.FREEPIK_MAX_CONCURRENCY,
+            max_keepalive_connections=CONFIG.FREEPIK_MAX_CONCURRENCY,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+        )
+    )
 
 
 class FreepikClient:
     """Client for interacting with Freepik RunWay Act Two API"""
 
-    def __init__(self):
-        self.api_key = FREEPIK_API_KEY
-        self.headers = {
-            "x-freepik-api-key": self.api_key,
-            "Content-Type": "application/json"
-        }
-        self._status_url_templates = {
-            "runway_act_two": FREEPIK_RUNWAY_STATUS_URL_TEMPLATE,
-            "seedream_edit": FREEPIK_SEEDREAM_EDIT_STATUS_URL_TEMPLATE,
-            "kling_v2_5_pro": FREEPIK_KLING_STATUS_URL_TEMPLATE
+    def __init__(self, http: Optional[httpx.AsyncClient] = None):
+        self.api_key = CONFIG.FREEPIK_API_KEY
+        self._status_url_builders = {
+            "runway_act_two": runway_status_url,
+            "seedream_edit": seedream_edit_status_url,
+            "kling_v2_5_pro": kling_status_url
         }
+        self._http = http
+        # Only a client created here is closed by aclose()
+        self._owns_http = False
+        # Caps in-flight requests per worker so a slow Freepik cannot pile up
+        # unbounded pending calls; retry backoff waits outside the limit
+        self._limiter = asyncio.Semaphore(CONFIG.FREEPIK_MAX_CONCURRENCY)
+        self._breaker = CircuitBreaker("freepik")
+
+    async def start(self, http: Optional[httpx.AsyncClient] = None):
+        """
+        Attach the shared connection pool (called on app startup)
+
+        Args:
+            http: Client owned by the app; a private one is created if omitted
+        """
+        if http is not None:
+            self._http = http
+            self._owns_http = False
+        else:
+            self._get_http()
+
+    async def aclose(self):
+        """Close the connection pool if this client created it"""
+        if self._http is not None and self._owns_http:
+            await self._http.aclose()
+        self._http = None
+        self._owns_http = False
+
+    def _get_http(self) -> httpx.AsyncClient:
+        """Shared HTTP client; reused across calls to keep TLS connections alive"""
+        if self._http is None:
+            self._http = create_http_client()
+            self._owns_http = True
+        return self._http
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Send one request, waiting for a free slot under the concurrency limit"""
+        async with self._limiter:
+            return await self._get_http().request(method, endpoint, **kwargs)
+
+    async def _post_with_retry(self, endpoint: str, payload: Dict) -> httpx.Response:
+        """
+        POST a task creation request, retrying rate limits, unavailability
+        and failed connections, within CREATE_DEADLINE_SECONDS
 
+        Returns:
+            httpx.Response: Successful response
+
+        Raises:
+            httpx.HTTPStatusError: Error status after the last attempt
+            httpx.RequestError: Network error after the last attempt
+            asyncio.TimeoutError: Deadline passed (the task may exist)
+        """
+        try:
+            return await asyncio.wait_for(self._post_attempts(endpoint, payload), CREATE_DEADLINE_SECONDS)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"No answer from Freepik within {CREATE_DEADLINE_SECONDS}s") from None
+
+    async def _post_attempts(self, endpoint: str, payload: Dict) -> httpx.Response:
+        for attempt in range(CREATE_MAX_ATTEMPTS):
+            last_attempt = attempt == CREATE_MAX_ATTEMPTS - 1
+            try:
+                response = await self._request("POST", endpoint, content=_json_encode(payload))
+            except _NOT_SENT_ERRORS as e:
+                # The request never reached Freepik
+                if last_attempt:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning("[RETRY] %s: %r, retrying in %.1fs", endpoint, e, delay)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    response.raise_for_status()
+                    return response
+                delay = retry_delay(attempt, response)
+                logger.warning("[RETRY] %s: HTTP %s, retrying in %.1fs", endpoint, response.status_code, delay)
+            await asyncio.sleep(delay)
+
+    @guarded
     async def create_task(
         self,
         character_url: str,
@@ -53,7 +249,7 @@ class FreepikClient:
         Returns:
             dict: Task creation result with task_id and status
         """
-        endpoint = FREEPIK_RUNWAY_CREATE_URL
+        endpoint = CONFIG.FREEPIK_RUNWAY_CREATE_URL
 
         payload = {
             "character": {
@@ -71,45 +267,42 @@ class FreepikClient:
 
         if seed is not None:
             payload["seed"] = seed
+        if WEBHOOKS_ENABLED:
+            payload["webhook_url"] = CONFIG.FREEPIK_WEBHOOK_URL
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                print(f"Sending request to: {endpoint}")
-                print(f"Payload: {payload}")
-
-                response = await client.post(
-                    endpoint,
-                    json=payload,
-                    headers=self.headers
-                )
+            logger.debug("Sending request to: %s", endpoint)
+            logger.debug("Payload: %s", payload)
 
-                print(f"Response status: {response.status_code}")
-                print(f"Response body: {response.text}")
+            response = await self._post_with_retry(endpoint, payload)
 
-                response.raise_for_status()
+            logger.debug("Response status: %s", response.status_code)
+            logger.debug("Response body: %s", response.content)
 
-                data = response.json()
-                return {
-                    "success": True,
-                    "task_id": data["data"]["task_id"],
-                    "status": data["data"]["status"],
-                    "raw_response": data
-                }
+            data = _json_decode(response.content)
+            return {
+                "success": True,
+                "task_id": data["data"]["task_id"],
+                "status": data["data"]["status"],
+                "raw_response": data
+            }
 
         except httpx.HTTPStatusError as e:
             error_details = e.response.text
-            print(f"API Error {e.response.status_code}: {error_details}")
+            logger.warning("API Error %s: %s", e.response.status_code, error_details)
             return {
                 "success": False,
                 "error": f"HTTP error: {e.response.status_code}",
                 "details": error_details,
-                "transient": 500 <= e.response.status_code < 600
+                "transient": is_transient(e.response.status_code),
+                "retryable": create_may_retry(e)
             }
         except httpx.RequestError as e:
             return {
                 "success": False,
                 "error": f"Request error: {str(e)}",
-                "transient": True
+                "transient": True,
+                "retryable": create_may_retry(e)
             }
         except Exception as e:
             return {
@@ -117,6 +310,7 @@ class FreepikClient:
                 "error": str(e)
             }
 
+    @guarded
     async def get_task_status(self, task_id: str, model: str = "runway_act_two") -> Dict:
         """
         Get the status of a task
@@ -128,45 +322,40 @@ class FreepikClient:
         Returns:
             dict: Task status and result URLs if ready
         """
-        template = self._status_url_templates.get(model)
-        if not template:
+        status_url = self._status_url_builders.get(model)
+        if not status_url:
             return {
                 "success": False,
                 "error": f"Status endpoint not configured for model: {model}"
             }
 
-        endpoint = template.format(task_id=task_id)
+        endpoint = status_url(task_id)
 
-        print(f"[STATUS CHECK] Endpoint: {endpoint}")
-        print(f"[STATUS CHECK] Task ID: {task_id}")
+        logger.debug("[STATUS CHECK] Endpoint: %s", endpoint)
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    endpoint,
-                    headers=self.headers
-                )
-                print(f"[STATUS CHECK] Response status: {response.status_code}")
-                print(f"[STATUS CHECK] Response body: {response.text}")
-                response.raise_for_status()
-
-                data = response.json()
-                task_data = data.get("data", {})
-
-                return {
-                    "success": True,
-                    "task_id": task_id,
-                    "status": task_data.get("status", "UNKNOWN"),
-                    "result_urls": task_data.get("generated", []),
-                    "raw_response": data
-                }
+            response = await self._request("GET", endpoint)
+            logger.debug("[STATUS CHECK] Response status: %s", response.status_code)
+            logger.debug("[STATUS CHECK] Response body: %s", response.content)
+            response.raise_for_status()
+
+            data = _json_decode(response.content)
+            task_data = data.get("data", {})
+
+            return {
+                "success": True,
+                "task_id": task_id,
+                "status": task_data.get("status", "UNKNOWN"),
+                "result_urls": task_data.get("generated", []),
+                "raw_response": data
+            }
 
         except httpx.HTTPStatusError as e:
             return {
                 "success": False,
                 "error": f"HTTP error: {e.response.status_code}",
                 "details": e.response.text,
-                "transient": 500 <= e.response.status_code < 600
+                "transient": is_transient(e.response.status_code)
             }
         except httpx.RequestError as e:
             return {
@@ -180,6 +369,7 @@ class FreepikClient:
                 "error": str(e)
             }
 
+    @guarded
     async def get_all_tasks(self) -> Dict:
         """
         Get all tasks (optional, for debugging)
@@ -187,21 +377,17 @@ class FreepikClient:
         Returns:
             dict: List of all tasks
         """
-        endpoint = f"{FREEPIK_RUNWAY_CREATE_URL}-tasks"
+        endpoint = f"{CONFIG.FREEPIK_RUNWAY_CREATE_URL}-tasks"
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    endpoint,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-
-                data = response.json()
-                return {
-                    "success": True,
-                    "tasks": data.get("data", [])
-                }
+            response = await self._request("GET", endpoint)
+            response.raise_for_status()
+
+            data = _json_decode(response.content)
+            return {
+                "success": True,
+                "tasks": data.get("data", [])
+            }
 
         except Exception as e:
             return {
@@ -209,6 +395,7 @@ class FreepikClient:
                 "error": str(e)
             }
 
+    @guarded
     async def create_seedream_edit_task(
         self,
         frame_url: str,
@@ -231,12 +418,12 @@ class FreepikClient:
         Returns:
             dict: Task creation result with task_id and status
         """
-        if not FREEPIK_SEEDREAM_EDIT_CREATE_URL:
+        if not CONFIG.FREEPIK_SEEDREAM_EDIT_CREATE_URL:
             return {
                 "success": False,
                 "error": "FREEPIK_SEEDREAM_EDIT_CREATE_URL is not set"
             }
-        endpoint = FREEPIK_SEEDREAM_EDIT_CREATE_URL
+        endpoint = CONFIG.FREEPIK_SEEDREAM_EDIT_CREATE_URL
 
         payload = {
             "prompt": prompt,
@@ -244,37 +431,42 @@ class FreepikClient:
             "aspect_ratio": aspect_ratio,
             "guidance_scale": guidance_scale
         }
+        if WEBHOOKS_ENABLED:
+            payload["webhook_url"] = CONFIG.FREEPIK_WEBHOOK_URL
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                print(f"[SEEDREAM EDIT] Sending request to: {endpoint}")
-                print(f"[SEEDREAM EDIT] Payload: {payload}")
+            logger.debug("[SEEDREAM EDIT] Sending request to: %s", endpoint)
+            logger.debug("[SEEDREAM EDIT] Payload: %s", payload)
 
-                response = await client.post(
-                    endpoint,
-                    json=payload,
-                    headers=self.headers
-                )
+            response = await self._post_with_retry(endpoint, payload)
 
-                print(f"[SEEDREAM EDIT] Response status: {response.status_code}")
-                print(f"[SEEDREAM EDIT] Response body: {response.text}")
+            logger.debug("[SEEDREAM EDIT] Response status: %s", response.status_code)
+            logger.debug("[SEEDREAM EDIT] Response body: %s", response.content)
 
-                response.raise_for_status()
-
-                data = response.json()
-                return {
-                    "success": True,
-                    "task_id": data["data"]["task_id"],
-                    "status": data["data"]["status"],
-                    "raw_response": data
-                }
+            data = _json_decode(response.content)
+            return {
+                "success": True,
+                "task_id": data["data"]["task_id"],
+                "status": data["data"]["status"],
+                "raw_response": data
+            }
 
         except httpx.HTTPStatusError as e:
-            print(f"[SEEDREAM EDIT] API Error {e.response.status_code}: {e.response.text}")
+            error_details = e.response.text
+            logger.warning("[SEEDREAM EDIT] API Error %s: %s", e.response.status_code, error_details)
             return {
                 "success": False,
                 "error": f"HTTP error: {e.response.status_code}",
-                "details": e.response.text
+                "details": error_details,
+                "transient": is_transient(e.response.status_code),
+                "retryable": create_may_retry(e)
+            }
+        except httpx.RequestError as e:
+            return {
+                "success": False,
+                "error": f"Request error: {str(e)}",
+                "transient": True,
+                "retryable": create_may_retry(e)
             }
         except Exception as e:
             return {
@@ -282,6 +474,7 @@ class FreepikClient:
                 "error": str(e)
             }
 
+    @guarded
     async def create_kling_task(
         self,
         input_image_url: str,
@@ -301,12 +494,12 @@ class FreepikClient:
         Returns:
             dict: Task creation result with task_id and status
         """
-        if not FREEPIK_KLING_CREATE_URL:
+        if not CONFIG.FREEPIK_KLING_CREATE_URL:
             return {
                 "success": False,
                 "error": "FREEPIK_KLING_CREATE_URL is not set"
             }
-        endpoint = FREEPIK_KLING_CREATE_URL
+        endpoint = CONFIG.FREEPIK_KLING_CREATE_URL
 
         payload = {
             "prompt": generation_prompt,
@@ -314,37 +507,42 @@ class FreepikClient:
             "duration": duration,
             "cfg_scale": cfg_scale
         }
+        if WEBHOOKS_ENABLED:
+            payload["webhook_url"] = CONFIG.FREEPIK_WEBHOOK_URL
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                print(f"[KLING] Sending request to: {endpoint}")
-                print(f"[KLING] Payload: {payload}")
+            logger.debug("[KLING] Sending request to: %s", endpoint)
+            logger.debug("[KLING] Payload: %s", payload)
 
-                response = await client.post(
-                    endpoint,
-                    json=payload,
-                    headers=self.headers
-                )
+            response = await self._post_with_retry(endpoint, payload)
 
-                print(f"[KLING] Response status: {response.status_code}")
-                print(f"[KLING] Response body: {response.text}")
+            logger.debug("[KLING] Response status: %s", response.status_code)
+            logger.debug("[KLING] Response body: %s", response.content)
 
-                response.raise_for_status()
-
-                data = response.json()
-                return {
-                    "success": True,
-                    "task_id": data["data"]["task_id"],
-                    "status": data["data"]["status"],
-                    "raw_response": data
-                }
+            data = _json_decode(response.content)
+            return {
+                "success": True,
+                "task_id": data["data"]["task_id"],
+                "status": data["data"]["status"],
+                "raw_response": data
+            }
 
         except httpx.HTTPStatusError as e:
-            print(f"[KLING] API Error {e.response.status_code}: {e.response.text}")
+            error_details = e.response.text
+            logger.warning("[KLING] API Error %s: %s", e.response.status_code, error_details)
             return {
                 "success": False,
                 "error": f"HTTP error: {e.response.status_code}",
-                "details": e.response.text
+                "details": error_details,
+                "transient": is_transient(e.response.status_code),
+                "retryable": create_may_retry(e)
+            }
+        except httpx.RequestError as e:
+            return {
+                "success": False,
+                "error": f"Request error: {str(e)}",
+                "transient": True,
+                "retryable": create_may_retry(e)
             }
         except Exception as e:
             return {
@@ -354,9 +552,9 @@ class FreepikClient:
 
 
 # Create a singleton instance (mock or real based on MOCK_MODE)
-if MOCK_MODE:
+if CONFIG.MOCK_MODE:
     from services.mock_service import MockFreepikClient
-    print("⚠️  MOCK MODE ENABLED - API calls will be simulated")
+    logger.warning("⚠️  MOCK MODE ENABLED - API calls will be simulated")
     freepik_client = MockFreepikClient()
 else:
     freepik_client = FreepikClient()
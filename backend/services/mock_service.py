@@ -2,16 +2,41 @@
 Mock service для тестирования без вызова реального API
 Симулирует Freepik API для разработки без трат
 """
-import asyncio
+import time
 import uuid
+from dataclasses import dataclass
 from typing import Dict
+from cachetools import TTLCache
+
+# Mock tasks are dropped after an hour (and beyond 10k) so a long-running
+# dev server does not accumulate them forever
+MOCK_TASK_TTL_SECONDS = 3600
+MOCK_TASK_LIMIT = 10_000
+
+
+@dataclass(slots=True)
+class MockTask:
+    """Состояние mock task"""
+    model: str
+    start_time: float
+    status: str = "CREATED"
+    frame_url: str = ""
+    character_url: str = ""
+    input_image_url: str = ""
 
 
 class MockFreepikClient:
     """Mock client для локального тестирования"""
 
     def __init__(self):
-        self.tasks = {}  # Хранение состояний mock tasks
+        # Хранение состояний mock tasks
+        self.tasks = TTLCache(maxsize=MOCK_TASK_LIMIT, ttl=MOCK_TASK_TTL_SECONDS)
+
+    async def start(self, http=None):
+        """No connection pool is used in mock mode"""
+
+    async def aclose(self):
+        """No connection pool to close in mock mode"""
 
     async def create_task(self, **kwargs) -> Dict:
         """Mock RunWay Act Two task (legacy method for compatibility)"""
@@ -20,11 +45,7 @@ class MockFreepikClient:
     async def create_runway_task(self, **kwargs) -> Dict:
         """Mock RunWay Act Two task"""
         task_id = str(uuid.uuid4())
-        self.tasks[task_id] = {
-            "status": "CREATED",
-            "model": "runway_act_two",
-            "start_time": asyncio.get_event_loop().time()
-        }
+        self.tasks[task_id] = MockTask(model="runway_act_two", start_time=time.monotonic())
 
         return {
             "success": True,
@@ -32,17 +53,6 @@ class MockFreepikClient:
             "status": "CREATED"
         }
 
-    async def create_nano_banana_task(
-        self,
-        character_url: str,
-        frame_url: str,
-        **kwargs
-    ) -> Dict:
-        return {
-            "success": False,
-            "error": "Nano Banana is not supported in this pipeline"
-        }
-
     async def create_seedream_edit_task(
         self,
         frame_url: str,
@@ -50,13 +60,12 @@ class MockFreepikClient:
         **kwargs
     ) -> Dict:
         task_id = str(uuid.uuid4())
-        self.tasks[task_id] = {
-            "status": "CREATED",
-            "model": "seedream_edit",
-            "start_time": asyncio.get_event_loop().time(),
-            "frame_url": frame_url,
-            "character_url": character_url
-        }
+        self.tasks[task_id] = MockTask(
+            model="seedream_edit",
+            start_time=time.monotonic(),
+            frame_url=frame_url,
+            character_url=character_url
+        )
 
         return {
             "success": True,
@@ -76,12 +85,11 @@ class MockFreepikClient:
             input_image_url: URL картинки с заменённым лицом
         """
         task_id = str(uuid.uuid4())
-        self.tasks[task_id] = {
-            "status": "CREATED",
-            "model": "kling",
-            "start_time": asyncio.get_event_loop().time(),
-            "input_image_url": input_image_url
-        }
+        self.tasks[task_id] = MockTask(
+            model="kling",
+            start_time=time.monotonic(),
+            input_image_url=input_image_url
+        )
 
         return {
             "success": True,
@@ -98,15 +106,14 @@ class MockFreepikClient:
         10-15 секунд: PROCESSING
         15+ секунд: COMPLETED
         """
-        if task_id not in self.tasks:
+        task = self.tasks.get(task_id)
+        if task is None:
             return {
                 "success": False,
                 "error": "Task not found"
             }
 
-        task = self.tasks[task_id]
-        current_time = asyncio.get_event_loop().time()
-        elapsed = current_time - task["start_time"]
+        elapsed = time.monotonic() - task.start_time
 
         # Симуляция прогресса
         if elapsed < 10:
@@ -118,10 +125,9 @@ class MockFreepikClient:
         else:
             status = "COMPLETED"
             # Mock URL для результата (зависит от модели)
-            model = task.get("model", "runway_act_two")
-            if model == "seedream_edit":
+            if task.model == "seedream_edit":
                 result_urls = ["https://storage.googleapis.com/mock-image-result.jpg"]
-            elif model == "kling":
+            elif task.model == "kling":
                 # Kling возвращает VIDEO
                 result_urls = ["https://storage.googleapis.com/mock-video-result.mp4"]
             else:
@@ -0,0 +1,541 @@
+"""
+Storage service for upload and task records
+
+Uses Redis when REDIS_URL is set, so that state is shared between workers.
+Without Redis, records are kept in process memory (single worker only, as in
+local development). Records expire after their TTL in both cases.
+"""
+import asyncio
+import functools
+import logging
+import math
+from types import MappingProxyType
+from typing import AsyncIterator, Callable, Dict, List, Mapping, Optional, Set, Tuple, Type, TypeVar
+import msgspec
+from cachetools import TLRUCache
+from config import CONFIG
+from models import ModelType, PipelineStage
+
+logger = logging.getLogger(__name__)
+
+# Uploads only need to live until /api/generate turns them into a task
+# (the task keeps its own copy of the URLs); tasks stay pollable for a day
+UPLOAD_TTL_SECONDS = 3600
+TASK_TTL_SECONDS = 24 * 3600
+
+UPLOAD_PREFIX = "upload:"
+TASK_PREFIX = "task:"
+UPSTREAM_PREFIX = "upstream:"
+POLLED_PREFIX = "polled:"
+LOCK_PREFIX = "lock:"
+COUNTER_PREFIX = "counter:"
+
+# Pub/sub channel announcing upstream (Freepik) task updates
+TASK_EVENTS_CHANNEL = "task-events"
+
+# Keys per SCAN/HGETALL round-trip (and records per batch) when listing records
+SCAN_BATCH_SIZE = 500
+
+# Pause before the shared Redis subscriber reconnects after losing its connection
+SUBSCRIBER_RETRY_SECONDS = 1.0
+
+# Upper bound on records held by the in-memory store (least recently used
+# records are evicted first)
+MEMORY_MAX_RECORDS = 100_000
+
+
+class UploadRecord(msgspec.Struct, gc=False):
+    """Files uploaded to Cloudinary via /api/upload"""
+    character_url: str
+    reference_url: str
+    character_public_id: str
+    reference_public_id: str
+
+
+class TaskRecord(msgspec.Struct, kw_only=True, gc=False):
+    """Generation task state tracked between status polls"""
+    upload_id: Optional[str] = None
+    character_url: str
+    reference_url: str
+    status: str
+    settings: dict
+    model: ModelType
+    # pipeline extras
+    frame_url: Optional[str] = None
+    pipeline_stage: Optional[PipelineStage] = None
+    seedream_task_id: Optional[str] = None
+    runway_task_id: Optional[str] = None
+    intermediate_url: Optional[str] = None
+    result_urls: List[str] = []
+
+
+class UpstreamStatus(msgspec.Struct, gc=False):
+    """Freepik task status, as pushed by webhook or polled"""
+    status: str
+    result_urls: List[str] = []
+    # Wall-clock time the status was reported (shared between workers)
+    updated_at: float = 0.0
+
+
+R = TypeVar("R", UploadRecord, TaskRecord, UpstreamStatus)
+
+
+@functools.cache
+def _field_types(record_type: Type[msgspec.Struct]) -> Mapping[str, object]:
+    """Type of each field of a record type, for decoding single fields"""
+    return MappingProxyType({field.name: field.type for field in msgspec.structs.fields(record_type)})
+
+
+class MemoryStore:
+    """In-process storage (state is per worker), bounded in size"""
+
+    def __init__(self, maxsize: int = MEMORY_MAX_RECORDS):
+        # Values are stored as (record, ttl_seconds) so each key keeps its own TTL
+        self._data = TLRUCache(maxsize=maxsize, ttu=self._expires_at)
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @staticmethod
+    def _expires_at(key: str, item: tuple, now: float) -> float:
+        ex = item[1]
+        return now + ex if ex is not None else math.inf
+
+    async def get(self, key: str, record_type: Type[R]) -> Optional[R]:
+        item = self._data.get(key)
+        return item[0] if item is not None else None
+
+    async def get_fields(self, key: str, record_type: Type[R], fields: Tuple[str, ...]) -> Optional[tuple]:
+        item = self._data.get(key)
+        return tuple(getattr(item[0], name) for name in fields) if item is not None else None
+
+    async def set(self, key: str, value: msgspec.Struct, ex: Optional[float] = None):
+        self._data[key] = (value, ex)
+
+    async def update(self, key: str, changes: Dict[str, object]) -> bool:
+        item = self._data.get(key)
+        if item is None:
+            return False
+        for name, value in changes.items():
+            setattr(item[0], name, value)
+        return True
+
+    async def compare_and_set(
+        self, key: str, value: msgspec.Struct, ex: Optional[float], record_type: Type[R], check: Callable[[R], bool],
+        missing_ok: bool = False
+    ) -> bool:
+        item = self._data.get(key)
+        if item is None and not missing_ok or item is not None and not check(item[0]):
+            return False
+        self._data[key] = (value, ex)
+        return True
+
+    async def set_nx(self, key: str, ex: int) -> bool:
+        if key in self._data:
+            return False
+        self._data[key] = (None, ex)
+        return True
+
+    async def exists(self, key: str) -> bool:
+        return key in self._data
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, ex: int) -> int:
+        item = self._data.get(key)
+        value = (item[0] if item is not None else 0) + 1
+        self._data[key] = (value, ex)
+        return value
+
+    async def scan(self, prefix: str, record_type: Type[R]) -> AsyncIterator[List[Tuple[str, R]]]:
+        start = len(prefix)
+        batch = []
+        for key, item in list(self._data.items()):
+            if key.startswith(prefix):
+                batch.append((key[start:], item[0]))
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    async def publish(self, channel: str, message: str):
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+    async def close(self):
+        pass
+
+
+class RedisStore:
+    """
+    Redis storage; each record is a hash with one msgpack-encoded field per
+    attribute, so updates rewrite only the fields that changed
+    """
+
+    def __init__(self, url: str):
+        self._redis = aioredis.Redis.from_url(url, decode_responses=False)
+        # One pub/sub connection per worker, fanned out to local subscriber queues
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder()
+
+    def _encode(self, value: msgspec.Struct) -> Dict[str, bytes]:
+        encode = self._encoder.encode
+        return {name: encode(getattr(value, name)) for name in value.__struct_fields__}
+
+    def _decode(self, raw: Dict[bytes, bytes], record_type: Type[R]) -> Optional[R]:
+        if not raw:
+            return None
+        decode = self._decoder.decode
+        try:
+            return msgspec.convert({name.decode(): decode(field) for name, field in raw.items()}, record_type)
+        except msgspec.ValidationError:
+            # Partial hash left by an update racing the record's expiry
+            return None
+
+    async def get(self, key: str, record_type: Type[R]) -> Optional[R]:
+        return self._decode(await self._redis.hgetall(key), record_type)
+
+    async def get_fields(self, key: str, record_type: Type[R], fields: Tuple[str, ...]) -> Optional[tuple]:
+        raw = await self._redis.hmget(key, fields)
+        if None in raw:
+            # Missing record, or a partial hash left by an update racing its expiry
+            return None
+        types = _field_types(record_type)
+        decode = self._decoder.decode
+        try:
+            return tuple(msgspec.convert(decode(value), types[name]) for name, value in zip(fields, raw))
+        except msgspec.ValidationError:
+            return None
+
+    async def set(self, key: str, value: msgspec.Struct, ex: Optional[float] = None):
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self._encode(value))
+            if ex is not None:
+                pipe.pexpire(key, int(ex * 1000))
+            await pipe.execute()
+
+    async def update(self, key: str, changes: Dict[str, object]) -> bool:
+        encode = self._encoder.encode
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={name: encode(value) for name, value in changes.items()})
+            pipe.pttl(key)
+            _, ttl = await pipe.execute()
+        if ttl == -1:
+            # The record had expired, so HSET created a partial one; drop it
+            await self._redis.delete(key)
+            return False
+        return True
+
+    async def compare_and_set(
+        self, key: str, value: msgspec.Struct, ex: Optional[float], record_type: Type[R], check: Callable[[R], bool],
+        missing_ok: bool = False
+    ) -> bool:
+        # Optimistic transaction: EXEC fails if the key changes after WATCH
+        async with self._redis.pipeline() as pipe:
+            try:
+                await pipe.watch(key)
+                current = self._decode(await pipe.hgetall(key), record_type)
+                if current is None and not missing_ok or current is not None and not check(current):
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping=self._encode(value))
+                if ex is not None:
+                    pipe.pexpire(key, int(ex * 1000))
+                await pipe.execute()
+                return True
+            except aioredis.WatchError:
+                return False
+
+    async def set_nx(self, key: str, ex: int) -> bool:
+        return bool(await self._redis.set(key, b"1", nx=True, ex=ex))
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._redis.exists(key))
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+    async def incr(self, key: str, ex: int) -> int:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, ex)
+            value, _ = await pipe.execute()
+        return value
+
+    async def scan(self, prefix: str, record_type: Type[R]) -> AsyncIterator[List[Tuple[str, R]]]:
+        start = len(prefix)
+        keys: List[bytes] = []
+
+        async def fetch(batch_keys: List[bytes]) -> List[Tuple[str, R]]:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in batch_keys:
+                    pipe.hgetall(key)
+                hashes = await pipe.execute()
+            records = ((key, self._decode(raw, record_type)) for key, raw in zip(batch_keys, hashes))
+            return [
+                (key.decode()[start:], record)
+                for key, record in records
+                # Key may have expired between SCAN and HGETALL
+                if record is not None
+            ]
+
+        async for key in self._redis.scan_iter(match=f"{prefix}*", count=SCAN_BATCH_SIZE, _type="hash"):
+            keys.append(key)
+            if len(keys) >= SCAN_BATCH_SIZE:
+                yield await fetch(keys)
+                keys = []
+        if keys:
+            yield await fetch(keys)
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        subscribers = self._subscribers.setdefault(channel, set())
+        subscribers.add(queue)
+        try:
+            # Channels stay subscribed for the worker's lifetime
+            if channel.encode() not in self._pubsub.channels:
+                await self._pubsub.subscribe(channel)
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers.discard(queue)
+
+    async def _listen(self):
+        """Forward messages from the shared pub/sub connection to local subscribers"""
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    data = message["data"].decode()
+                    for queue in self._subscribers.get(message["channel"].decode(), ()):
+                        queue.put_nowait(data)
+                return
+            except aioredis.ConnectionError as e:
+                # Subscribers keep waiting; the reconnect resubscribes the channels
+                logger.warning("Task events subscriber disconnected: %s", e)
+                await asyncio.sleep(SUBSCRIBER_RETRY_SECONDS)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+
+# Create a singleton store (Redis or in-memory based on REDIS_URL)
+if CONFIG.REDIS_URL:
+    from redis import asyncio as aioredis
+    _store = RedisStore(CONFIG.REDIS_URL)
+else:
+    _store = MemoryStore()
+
+
+async def get_upload(upload_id: str) -> Optional[UploadRecord]:
+    """Get an upload record by ID"""
+    return await _store.get(UPLOAD_PREFIX + upload_id, UploadRecord)
+
+
+async def set_upload(upload_id: str, record: UploadRecord, ex: int = UPLOAD_TTL_SECONDS):
+    """Store an upload record, expiring after `ex` seconds"""
+    await _store.set(UPLOAD_PREFIX + upload_id, record, ex=ex)
+
+
+async def get_task(task_id: str) -> Optional[TaskRecord]:
+    """Get a task record by ID"""
+    return await _store.get(TASK_PREFIX + task_id, TaskRecord)
+
+
+async def get_task_fields(task_id: str, *fields: str) -> Optional[tuple]:
+    """
+    Get some fields of a task without loading the whole record
+
+    Args:
+        task_id: Task ID
+        *fields: TaskRecord field names
+
+    Returns:
+        Optional[tuple]: The field values in the order given, None if the task does not exist
+    """
+    return await _store.get_fields(TASK_PREFIX + task_id, TaskRecord, fields)
+
+
+async def set_task(task_id: str, record: TaskRecord, ex: int = TASK_TTL_SECONDS):
+    """Store a task record, expiring after `ex` seconds"""
+    await _store.set(TASK_PREFIX + task_id, record, ex=ex)
+
+
+async def update_task(task_id: str, record: TaskRecord, **changes) -> bool:
+    """
+    Change some fields of a task, writing only the ones whose value differs
+
+    Args:
+        task_id: Task ID
+        record: The caller's copy of the task, updated in place
+        **changes: New field values
+
+    Returns:
+        bool: False if the task no longer exists in storage
+    """
+    changed = {name: value for name, value in changes.items() if getattr(record, name) != value}
+    if not changed:
+        return True
+    for name, value in changed.items():
+        setattr(record, name, value)
+    return await _store.update(TASK_PREFIX + task_id, changed)
+
+
+async def update_task_fields(task_id: str, **changes) -> bool:
+    """
+    Change some fields of a task the caller holds no copy of
+
+    Returns:
+        bool: False if the task no longer exists in storage
+    """
+    return await _store.update(TASK_PREFIX + task_id, changes)
+
+
+async def set_task_if(
+    task_id: str,
+    record: TaskRecord,
+    check: Callable[[TaskRecord], bool],
+    ex: int = TASK_TTL_SECONDS
+) -> bool:
+    """
+    Store a task record only if the stored one passes `check`, atomically
+
+    Args:
+        task_id: Task ID
+        record: New record (a copy; the stored record must not be mutated)
+        check: Condition on the currently stored record
+        ex: TTL in seconds
+
+    Returns:
+        bool: True if the record was stored
+    """
+    return await _store.compare_and_set(TASK_PREFIX + task_id, record, ex, TaskRecord, check)
+
+
+async def get_upstream_status(upstream_task_id: str) -> Optional[UpstreamStatus]:
+    """Get the last webhook-reported status of a Freepik task"""
+    return await _store.get(UPSTREAM_PREFIX + upstream_task_id, UpstreamStatus)
+
+
+async def set_upstream_status(
+    upstream_task_id: str,
+    record: UpstreamStatus,
+    check: Callable[[UpstreamStatus], bool],
+    ex: int = TASK_TTL_SECONDS
+) -> bool:
+    """
+    Store a Freepik task status and announce it on TASK_EVENTS_CHANNEL,
+    unless a status is already stored that fails `check` (atomically)
+
+    Args:
+        upstream_task_id: Freepik task ID
+        record: New status
+        check: Condition on the currently stored status, if any
+        ex: TTL in seconds
+
+    Returns:
+        bool: True if the status was stored
+    """
+    stored = await _store.compare_and_set(
+        UPSTREAM_PREFIX + upstream_task_id, record, ex, UpstreamStatus, check, missing_ok=True
+    )
+    if stored:
+        await publish_task_event(upstream_task_id)
+    return stored
+
+
+async def get_polled_status(upstream_task_id: str) -> Optional[UpstreamStatus]:
+    """Get a Freepik task status recently polled by any worker"""
+    return await _store.get(POLLED_PREFIX + upstream_task_id, UpstreamStatus)
+
+
+async def set_polled_status(upstream_task_id: str, record: UpstreamStatus, ex: float):
+    """Share a polled Freepik task status with other workers for `ex` seconds"""
+    await _store.set(POLLED_PREFIX + upstream_task_id, record, ex=ex)
+
+
+async def publish_task_event(task_id: str):
+    """Announce that a task (ours or Freepik's) has changed on TASK_EVENTS_CHANNEL"""
+    await _store.publish(TASK_EVENTS_CHANNEL, task_id)
+
+
+async def acquire_lock(name: str, ex: int) -> bool:
+    """
+    Take a named lock shared by all workers
+
+    Args:
+        name: Lock name
+        ex: Seconds until the lock is released automatically
+
+    Returns:
+        bool: True if this caller got the lock
+    """
+    return await _store.set_nx(LOCK_PREFIX + name, ex=ex)
+
+
+async def release_lock(name: str):
+    """Release a named lock before it expires"""
+    await _store.delete(LOCK_PREFIX + name)
+
+
+async def is_locked(name: str) -> bool:
+    """Check whether a named lock is currently held"""
+    return await _store.exists(LOCK_PREFIX + name)
+
+
+async def increment_counter(name: str, ex: int) -> int:
+    """
+    Increment a named counter shared by all workers
+
+    Args:
+        name: Counter name
+        ex: Seconds without increments after which the counter resets
+
+    Returns:
+        int: New counter value
+    """
+    return await _store.incr(COUNTER_PREFIX + name, ex=ex)
+
+
+async def reset_counter(name: str):
+    """Reset a named counter to zero"""
+    await _store.delete(COUNTER_PREFIX + name)
+
+
+def subscribe_task_events() -> AsyncIterator[str]:
+    """Iterate IDs of changed tasks (ours or Freepik's) as events arrive"""
+    return _store.subscribe(TASK_EVENTS_CHANNEL)
+
+
+def iter_uploads() -> AsyncIterator[List[Tuple[str, UploadRecord]]]:
+    """Iterate live upload records in batches of (upload_id, record)"""
+    return _store.scan(UPLOAD_PREFIX, UploadRecord)
+
+
+def iter_tasks() -> AsyncIterator[List[Tuple[str, TaskRecord]]]:
+    """Iterate live task records in batches of (task_id, record)"""
+    return _store.scan(TASK_PREFIX, TaskRecord)
+
+
+async def close():
+    """Release storage connections"""
+    await _store.close()
@@ -1,6 +1,7 @@
 // API Configuration
 const API_BASE_URL = 'http://localhost:8000';
-const POLL_INTERVAL = 10000; // 10 seconds
+const POLL_INTERVAL = 10000; // 10 seconds (used until the server sends a hint)
+const POLL_JITTER = 0.2; // Up to 20% extra delay per poll
 
 const MODELS = {
     RUNWAY: 'runway_act_two',
@@ -50,7 +51,11 @@ let referenceFile = null;
 let uploadId = null;
 let taskId = null;
 let pollingTimer = null;
+let eventSource = null;
+let pollingActive = false;
 let pollingErrorCount = 0;
+let pollDelay = POLL_INTERVAL;
+let lastPollState = null;
 let selectedModel = MODELS.RUNWAY;
 let frameUrl = null;           // uploaded frame URL for pipeline
 let intermediateUrl = null;    // result after Seedream Edit
@@ -383,18 +388,79 @@ function startPolling() {
         updateStatus('Uploaded', 25);
         pipelineProgress.classList.add('hidden');
     }
-    pollingTimer = setInterval(checkStatus, POLL_INTERVAL);
-    checkStatus(); // Check immediately
+    pollingActive = true;
+    pollDelay = POLL_INTERVAL;
+    lastPollState = null;
+    if (window.EventSource) {
+        followEvents();
+    } else {
+        checkStatus(); // Check immediately, then follow the server's hints
+    }
 }
 
 function stopPolling() {
+    pollingActive = false;
     if (pollingTimer) {
-        clearInterval(pollingTimer);
+        clearTimeout(pollingTimer);
         pollingTimer = null;
     }
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+}
+
+// Receive status updates pushed by the server; fall back to polling if the
+// stream cannot be opened or breaks
+function followEvents() {
+    eventSource = new EventSource(`${API_BASE_URL}/api/events/${taskId}`);
+
+    eventSource.addEventListener('status', (event) => {
+        pollingErrorCount = 0;
+        handleStatusUpdate(JSON.parse(event.data));
+    });
+
+    eventSource.addEventListener('error', (event) => {
+        const stream = eventSource;
+        eventSource = null;
+        stream.close();
+        if (!pollingActive) {
+            return;
+        }
+        if (event.data) {
+            // Error reported by the server (e.g. task not found)
+            stopPolling();
+            showError(JSON.parse(event.data).error);
+        } else {
+            checkStatus();
+        }
+    });
+}
+
+function scheduleNextPoll() {
+    if (pollingActive) {
+        // Jitter keeps tabs opened together from polling in lockstep
+        pollingTimer = setTimeout(checkStatus, pollDelay * (1 + Math.random() * POLL_JITTER));
+    }
+}
+
+// Use the server's poll_after_seconds hint; back off (up to max_wait_seconds)
+// while the status stays the same
+function updatePollDelay(data) {
+    if (!data.poll_after_seconds) {
+        return;
+    }
+    const hinted = data.poll_after_seconds * 1000;
+    const maxWait = (data.max_wait_seconds || data.poll_after_seconds) * 1000;
+    const state = `${data.status}:${data.pipeline_stage}:${data.progress_stage}`;
+    pollDelay = state === lastPollState
+        ? Math.max(hinted, Math.min(pollDelay * 2, maxWait))
+        : hinted;
+    lastPollState = state;
 }
 
 async function checkStatus() {
+    pollingTimer = null;
     try {
         const response = await fetch(`${API_BASE_URL}/api/status/${taskId}`);
 
@@ -415,69 +481,75 @@ async function checkStatus() {
 
         const data = await response.json();
         pollingErrorCount = 0;
-        const status = data.status;
-        const modelUsed = data.model_used || selectedModel;
-
-        if (modelUsed === MODELS.PIPELINE) {
-            const stage = data.pipeline_stage || 'IMAGE_EDIT_STARTED';
-            updatePipelineProgress(stage, data);
-
-            // Map pipeline stages to progress bar
-            const pipelineProgressMap = {
-                'FRAME_EXTRACTION': 15,
-                'FRAME_UPLOADED': 25,
-                'IMAGE_EDIT_STARTED': 40,
-                'IMAGE_EDIT_COMPLETED': 60,
-                'VIDEO_STARTED': 80,
-                'PIPELINE_COMPLETED': 100,
-                'FAILED': 0
-            };
-            updateStatus(stage, pipelineProgressMap[stage] || 40);
+        updatePollDelay(data);
+        handleStatusUpdate(data);
+    } catch (error) {
+        console.error('Polling error:', error);
+        handleTransientPollError(error.message);
+    } finally {
+        scheduleNextPoll();
+    }
+}
 
-            if (data.intermediate_url) {
-                intermediateUrl = data.intermediate_url;
-                intermediateImage.src = intermediateUrl;
-                intermediatePreview.classList.remove('hidden');
-            }
+function handleStatusUpdate(data) {
+    const status = data.status;
+    const modelUsed = data.model_used || selectedModel;
+
+    if (modelUsed === MODELS.PIPELINE) {
+        const stage = data.pipeline_stage || 'IMAGE_EDIT_STARTED';
+        updatePipelineProgress(stage, data);
+
+        // Map pipeline stages to progress bar
+        const pipelineProgressMap = {
+            'FRAME_EXTRACTION': 15,
+            'FRAME_UPLOADED': 25,
+            'IMAGE_EDIT_STARTED': 40,
+            'IMAGE_EDIT_COMPLETED': 60,
+            'VIDEO_STARTED': 80,
+            'PIPELINE_COMPLETED': 100,
+            'FAILED': 0
+        };
+        updateStatus(stage, pipelineProgressMap[stage] || 40);
 
-            if (status === 'COMPLETED') {
-                stopPolling();
-                const videoUrl = data.result_urls[0];
-                showResult(videoUrl, modelUsed, intermediateUrl);
-                saveToGallery(videoUrl, modelUsed, intermediateUrl);
-            } else if (status === 'FAILED') {
-                stopPolling();
-                showError('Pipeline завершился с ошибкой. Попробуйте снова.');
-            }
-        } else {
-            const progressStage = data.progress_stage;
-            const progressMap = {
-                'Uploaded': 25,
-                'In Progress': 40,
-                'Processing': 50,
-                'Finalizing': 75,
-                'Ready': 100,
-                'COMPLETED': 100,
-                'Failed': 0
-            };
+        if (data.intermediate_url) {
+            intermediateUrl = data.intermediate_url;
+            intermediateImage.src = intermediateUrl;
+            intermediatePreview.classList.remove('hidden');
+        }
 
-            pipelineProgress.classList.add('hidden');
-            updateStatus(progressStage, progressMap[progressStage] || 50);
-
-            if (status === 'READY' || status === 'COMPLETED') {
-                stopPolling();
-                const videoUrl = data.result_urls[0];
-                showResult(videoUrl, modelUsed);
-                saveToGallery(videoUrl, modelUsed);
-            } else if (status === 'FAILED') {
-                stopPolling();
-                showError('Генерация не удалась. Попробуйте с другими настройками или файлами.');
-            }
+        if (status === 'COMPLETED') {
+            stopPolling();
+            const videoUrl = data.result_urls[0];
+            showResult(videoUrl, modelUsed, intermediateUrl);
+            saveToGallery(videoUrl, modelUsed, intermediateUrl);
+        } else if (status === 'FAILED') {
+            stopPolling();
+            showError('Pipeline завершился с ошибкой. Попробуйте снова.');
         }
+    } else {
+        const progressStage = data.progress_stage;
+        const progressMap = {
+            'Uploaded': 25,
+            'In Progress': 40,
+            'Processing': 50,
+            'Finalizing': 75,
+            'Ready': 100,
+            'COMPLETED': 100,
+            'Failed': 0
+        };
 
-    } catch (error) {
-        console.error('Polling error:', error);
-        handleTransientPollError(error.message);
+        pipelineProgress.classList.add('hidden');
+        updateStatus(progressStage, progressMap[progressStage] || 50);
+
+        if (status === 'READY' || status === 'COMPLETED') {
+            stopPolling();
+            const videoUrl = data.result_urls[0];
+            showResult(videoUrl, modelUsed);
+            saveToGallery(videoUrl, modelUsed);
+        } else if (status === 'FAILED') {
+            stopPolling();
+            showError('Генерация не удалась. Попробуйте с другими настройками или файлами.');
+        }
     }
 }
 
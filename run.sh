@@ -13,7 +13,7 @@ echo ""
 
 # Check Python
 if ! command -v python3 &> /dev/null; then
-    echo "❌ Python 3 not found. Please install Python 3.8 or higher."
+    echo "❌ Python 3 not found. Please install Python 3.10 or higher."
     exit 1
 fi
 